@@ -1,9 +1,19 @@
 import os
 import sqlite3
-from datetime import datetime
-import uuid, hashlib, hmac
-from flask import Flask, g, render_template_string, request, redirect, url_for, abort, session, send_from_directory, jsonify
-import bleach
+import uuid, hashlib, functools, html, base64
+import ipaddress
+from datetime import datetime, timezone
+import threading
+import atexit
+from flask import Flask, Response, g, request, redirect, url_for, abort, send_from_directory, jsonify, stream_template
+# nh3 (Rust bindings over ammonia) sanitizes an order of magnitude faster
+# than bleach's pure-Python html5lib pipeline; fall back to bleach where the
+# wheel is unavailable.
+try:
+    import nh3
+except ImportError:
+    nh3 = None
+    import bleach
 
 # --- Config ---
 DB_PATH = os.environ.get("QA_DB_PATH", "/var/data/qa.sqlite3")
@@ -15,42 +25,129 @@ UPLOAD_DIR = "/var/data/uploads"
 
 app = Flask(__name__)
 app.config["SECRET_KEY"] = SECRET
-
-# Allowed HTML tags/attributes for rich text (Quill output)
-ALLOWED_TAGS = [
+# Static assets are immutable (favicon, future bundles): let clients cache hard.
+app.config["SEND_FILE_MAX_AGE_DEFAULT"] = 31536000
+# When a front-end server that understands X-Sendfile sits in front (Apache;
+# for nginx map it to X-Accel-Redirect), set USE_X_SENDFILE=1 so image bytes
+# never flow through the Python worker.
+app.config["USE_X_SENDFILE"] = bool(os.environ.get("USE_X_SENDFILE"))
+# Werkzeug rejects larger request bodies before they reach a handler.
+app.config["MAX_CONTENT_LENGTH"] = 8 * 1024 * 1024
+
+# Allowed HTML tags/attributes for rich text (Quill output); frozen so the
+# sanitizer's membership checks are hashed lookups and nothing mutates them
+ALLOWED_TAGS = frozenset({
     "b", "i", "u", "em", "strong",
     "p", "br", "h1", "h2", "h3", "blockquote",
-    "ul", "ol", "li", "span", "img", "div"
-]
+    "ul", "ol", "li", "span", "img", "div",
+})
 ALLOWED_ATTRS = {
-    "span": ["style"],
-    "div": ["style"],
-    "p": ["style"],
-    "img": ["src", "alt", "width", "height", "style"]
+    "span": frozenset({"style"}),
+    "div": frozenset({"style"}),
+    "p": frozenset({"style"}),
+    "img": frozenset({"src", "alt", "width", "height", "style"}),
 }
 
+# don't let a hostile client feed megabytes through the sanitizer; anything
+# past this is cut before cleaning (far beyond any legitimate post)
+MAX_BODY_LEN = 64_000
+
+# only plain web links survive sanitization; skipping the long default
+# scheme list also spares the sanitizer's per-URL fallback checks
+ALLOWED_PROTOCOLS = frozenset({"http", "https"})
+
+# bind the allow-lists once; call sites just pass the raw string
+if nh3 is not None:
+    clean_html = functools.partial(nh3.clean, tags=ALLOWED_TAGS, attributes=ALLOWED_ATTRS,
+                                   url_schemes=ALLOWED_PROTOCOLS)
+    _strip_tags = functools.partial(nh3.clean, tags=frozenset())
+else:
+    clean_html = functools.partial(bleach.clean, tags=ALLOWED_TAGS,
+                                   attributes=ALLOWED_ATTRS,
+                                   protocols=ALLOWED_PROTOCOLS,
+                                   strip=True, strip_comments=True)
+    _strip_tags = functools.partial(bleach.clean, tags=frozenset(), strip=True)
+
+# retries and bots resubmit identical bodies; a bounded memo skips the
+# parse+serialize entirely for repeats (inputs are already capped at
+# MAX_BODY_LEN, so the cache footprint is bounded too)
+clean_html = functools.lru_cache(maxsize=1024)(clean_html)
+
+def make_preview(raw_body: str) -> str:
+    """Plain-text teaser stored at write time so the index never strips HTML."""
+    return html.unescape(_strip_tags(raw_body))[:200]
+
 # --- DB helpers ---
-def get_db():
-    if "db" not in g:
-        g.db = sqlite3.connect(DB_PATH, detect_types=sqlite3.PARSE_DECLTYPES)
-        g.db.row_factory = sqlite3.Row
-    return g.db
+# One long-lived connection per worker thread: WAL lets N readers share the
+# file with a writer, and keeping connections open preserves the page cache
+# and avoids re-running connect + PRAGMAs on every request.
+_local = threading.local()
+_all_conns = []
+_conns_lock = threading.Lock()
 
-@app.teardown_appcontext
-def close_db(exception):
-    db = g.pop("db", None)
-    if db is not None:
-        db.close()
+def get_db():
+    db = getattr(_local, "db", None)
+    if db is None:
+        # check_same_thread=False only so the atexit hook below may close
+        # them; each connection is still used by its owning thread only.
+        # no detect_types: nothing compares timestamps in Python, so paying
+        # regex sniffing + datetime construction per fetched row buys nothing
+        db = sqlite3.connect(DB_PATH, cached_statements=256, check_same_thread=False)
+        db.row_factory = sqlite3.Row
+        # WAL keeps readers from blocking on vote/answer INSERTs;
+        # synchronous=NORMAL drops the per-commit fsync that dominates
+        # write latency with the default rollback journal.
+        db.executescript(
+            """
+            PRAGMA journal_mode=WAL;
+            PRAGMA synchronous=NORMAL;
+            PRAGMA temp_store=MEMORY;
+            PRAGMA mmap_size=268435456;
+            PRAGMA cache_size=-64000;
+            PRAGMA busy_timeout=5000;
+            PRAGMA foreign_keys=ON;
+            """
+        )
+        _local.db = db
+        with _conns_lock:
+            _all_conns.append(db)
+    return db
+
+@atexit.register
+def _close_conns():
+    with _conns_lock:
+        for db in _all_conns:
+            try:
+                # cheap no-op most of the time; refreshes stats when the
+                # planner would benefit (analysis_limit keeps it bounded)
+                db.execute("PRAGMA analysis_limit=1000")
+                db.execute("PRAGMA optimize")
+                db.close()
+            except sqlite3.Error:
+                pass
+        _all_conns.clear()
+
+# Bump when init_db() grows a new migration step. Stored in PRAGMA
+# user_version so booted processes skip the DDL entirely on a current DB.
+SCHEMA_VERSION = 9
 
 def init_db():
     db = get_db()
+    if db.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION:
+        return
+    # one immediate transaction for the whole script: a single write lock and
+    # one journal flush instead of a lock upgrade per CREATE statement
     db.executescript(
         """
+        BEGIN IMMEDIATE;
         CREATE TABLE IF NOT EXISTS questions (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             title TEXT NOT NULL,
             body TEXT,
-            created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+            preview TEXT,
+            created_at INTEGER NOT NULL DEFAULT (unixepoch()),
+            last_activity_at INTEGER NOT NULL DEFAULT (unixepoch()),
+            qvotes_count INTEGER NOT NULL DEFAULT 0
         );
 
         CREATE TABLE IF NOT EXISTS answers (
@@ -58,10 +155,13 @@ def init_db():
             question_id INTEGER NOT NULL,
             body TEXT NOT NULL,
             name TEXT,
-            created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            created_at INTEGER NOT NULL DEFAULT (unixepoch()),
+            vote_count INTEGER NOT NULL DEFAULT 0,
             FOREIGN KEY (question_id) REFERENCES questions(id) ON DELETE CASCADE
         );
         CREATE INDEX IF NOT EXISTS idx_answers_qid ON answers(question_id);
+        -- lets "last activity per question" resolve as a single index seek
+        CREATE INDEX IF NOT EXISTS idx_answers_qid_created ON answers(question_id, created_at DESC);
 
         -- Answer votes: one per question per anon device; toggleable; moving between answers allowed
         CREATE TABLE IF NOT EXISTS avotes (
@@ -70,27 +170,35 @@ def init_db():
             answer_id INTEGER NOT NULL,
             anon_hash TEXT NOT NULL,
             ip_hash TEXT,
-            created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            created_at INTEGER NOT NULL DEFAULT (unixepoch()),
             UNIQUE(question_id, anon_hash)
         );
-        CREATE INDEX IF NOT EXISTS idx_avotes_answer ON avotes(answer_id);
-        CREATE INDEX IF NOT EXISTS idx_avotes_question ON avotes(question_id);
-        CREATE INDEX IF NOT EXISTS idx_avotes_q_ip ON avotes(question_id, ip_hash);
+        -- per-question tallies group on answer_id; the composite serves them
+        -- index-only and also answers any bare question_id probe
+        CREATE INDEX IF NOT EXISTS idx_avotes_qa ON avotes(question_id, answer_id);
+        DROP INDEX IF EXISTS idx_avotes_question;  -- prefix of the covering index below
+        DROP INDEX IF EXISTS idx_avotes_q_ip;
+        CREATE INDEX IF NOT EXISTS idx_avotes_q_ip_created ON avotes(question_id, ip_hash, created_at);
+        -- covers "which answer did this caller vote for" without touching the table
+        CREATE INDEX IF NOT EXISTS idx_avotes_q_anon_cov ON avotes(question_id, anon_hash, answer_id);
+        -- the top_* sorts range-scan recent votes; covers the join column too
+        CREATE INDEX IF NOT EXISTS idx_avotes_created_answer ON avotes(created_at, answer_id);
 
         -- Question votes: one per question per anon device; toggleable
         CREATE TABLE IF NOT EXISTS qvotes (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             question_id INTEGER NOT NULL,
             anon_hash TEXT NOT NULL,
-            created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            created_at INTEGER NOT NULL DEFAULT (unixepoch()),
             UNIQUE(question_id, anon_hash)
         );
+        CREATE INDEX IF NOT EXISTS idx_qvotes_created_q ON qvotes(created_at, question_id);
 
         CREATE TABLE IF NOT EXISTS suggestions (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             body TEXT NOT NULL,
             contact TEXT,
-            created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+            created_at INTEGER NOT NULL DEFAULT (unixepoch())
         );
 
         CREATE TABLE IF NOT EXISTS analytics (
@@ -98,7 +206,7 @@ def init_db():
             event_type TEXT NOT NULL,
             path TEXT,
             ip_hash TEXT,
-            created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+            created_at INTEGER NOT NULL DEFAULT (unixepoch())
         );
         CREATE INDEX IF NOT EXISTS idx_analytics_event_time ON analytics(event_type, created_at);
         CREATE TABLE IF NOT EXISTS analytics (
@@ -106,12 +214,97 @@ def init_db():
     event_type TEXT NOT NULL,
     path TEXT,
     ip_hash TEXT,
-    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+    created_at INTEGER NOT NULL DEFAULT (unixepoch())
 );
 CREATE INDEX IF NOT EXISTS idx_analytics_event_time
     ON analytics(event_type, created_at);
+        COMMIT;
         """
     )
+
+    # one-shot migration for DBs created before questions.last_activity_at
+    try:
+        db.execute("ALTER TABLE questions ADD COLUMN last_activity_at INTEGER")
+    except sqlite3.OperationalError:
+        pass  # column already exists
+    else:
+        db.execute("""
+            UPDATE questions SET last_activity_at = COALESCE(
+                (SELECT MAX(created_at) FROM answers WHERE question_id = questions.id),
+                created_at)
+        """)
+    # created after the ALTER so pre-column DBs don't trip on it
+    db.execute("CREATE INDEX IF NOT EXISTS idx_q_activity ON questions(last_activity_at DESC)")
+
+    # one-shot migration for DBs created before questions.preview existed
+    try:
+        db.execute("ALTER TABLE questions ADD COLUMN preview TEXT")
+    except sqlite3.OperationalError:
+        pass  # column already exists
+    else:
+        rows = db.execute("SELECT id, body FROM questions WHERE body IS NOT NULL").fetchall()
+        db.executemany("UPDATE questions SET preview=? WHERE id=?",
+                       [(make_preview(r["body"]), r["id"]) for r in rows])
+
+    # one-shot migration for DBs created before questions.qvotes_count
+    try:
+        db.execute("ALTER TABLE questions ADD COLUMN qvotes_count INTEGER NOT NULL DEFAULT 0")
+        db.execute("UPDATE questions SET qvotes_count = (SELECT COUNT(*) FROM qvotes WHERE question_id = questions.id)")
+    except sqlite3.OperationalError:
+        pass  # column already exists
+
+    # one-shot migration for DBs created before answers.vote_count existed
+    try:
+        db.execute("ALTER TABLE answers ADD COLUMN vote_count INTEGER NOT NULL DEFAULT 0")
+        db.execute("UPDATE answers SET vote_count = (SELECT COUNT(*) FROM avotes WHERE answer_id = answers.id)")
+    except sqlite3.OperationalError:
+        pass  # column already exists
+    # only the backfill above looked avotes up by bare answer_id; keeping the
+    # single-column index alongside the composites just taxes vote writes
+    db.execute("DROP INDEX IF EXISTS idx_avotes_answer")
+
+    # one-shot migration: CURRENT_TIMESTAMP strings -> integer unix seconds,
+    # so listings never pay per-row text parsing and window predicates stay
+    # integer comparisons. typeof() makes each statement a no-op on rows
+    # (and reruns) that are already converted.
+    db.executescript("""
+        UPDATE questions SET created_at = unixepoch(created_at) WHERE typeof(created_at) = 'text';
+        UPDATE questions SET last_activity_at = unixepoch(last_activity_at) WHERE typeof(last_activity_at) = 'text';
+        UPDATE answers SET created_at = unixepoch(created_at) WHERE typeof(created_at) = 'text';
+        UPDATE avotes SET created_at = unixepoch(created_at) WHERE typeof(created_at) = 'text';
+        UPDATE qvotes SET created_at = unixepoch(created_at) WHERE typeof(created_at) = 'text';
+        UPDATE suggestions SET created_at = unixepoch(created_at) WHERE typeof(created_at) = 'text';
+        UPDATE analytics SET created_at = unixepoch(created_at) WHERE typeof(created_at) = 'text';
+    """)
+
+    # keep answers.vote_count and questions.last_activity_at in sync so
+    # reads never re-aggregate avotes or answers
+    db.executescript(
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_qvotes_ai AFTER INSERT ON qvotes BEGIN
+            UPDATE questions SET qvotes_count = qvotes_count + 1 WHERE id = NEW.question_id;
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_qvotes_ad AFTER DELETE ON qvotes BEGIN
+            UPDATE questions SET qvotes_count = qvotes_count - 1 WHERE id = OLD.question_id;
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_answers_ai AFTER INSERT ON answers BEGIN
+            UPDATE questions SET last_activity_at = NEW.created_at WHERE id = NEW.question_id;
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_avotes_ai AFTER INSERT ON avotes BEGIN
+            UPDATE answers SET vote_count = vote_count + 1 WHERE id = NEW.answer_id;
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_avotes_ad AFTER DELETE ON avotes BEGIN
+            UPDATE answers SET vote_count = vote_count - 1 WHERE id = OLD.answer_id;
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_avotes_au AFTER UPDATE OF answer_id ON avotes
+        WHEN OLD.answer_id <> NEW.answer_id BEGIN
+            UPDATE answers SET vote_count = vote_count - 1 WHERE id = OLD.answer_id;
+            UPDATE answers SET vote_count = vote_count + 1 WHERE id = NEW.answer_id;
+        END;
+        """
+    )
+    db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    db.execute("ANALYZE")
     db.commit()
 
 # --- Analytics Helper ---
@@ -120,635 +313,284 @@ def log_event(event_type, path):
         db = get_db()
         ip = client_ip()
         iphash = make_ip_hash(ip)
-        db.execute(
-            "INSERT INTO analytics(event_type, path, ip_hash, created_at) VALUES (?, ?, ?, ?)",
-            (event_type, path, iphash, datetime.utcnow()),
-        )
-        db.commit()
+        with db:
+            db.execute(
+                "INSERT INTO analytics(event_type, path, ip_hash, created_at) VALUES (?, ?, ?, unixepoch())",
+                (event_type, path, iphash),
+            )
     except Exception:
         pass  # Never break the site on analytics failure
 
+# The anon id is a random opaque token; it gains nothing from living in a
+# signed session cookie, and skipping the session avoids deserializing and
+# re-signing cookie payloads on every request.
 @app.before_request
-def ensure_db():
-    init_db()
-    if 'anon_id' not in session:
-        session['anon_id'] = uuid.uuid4().hex
+def ensure_anon_id():
+    # asset-ish paths never read g.anon_id; skip the cookie work (and any
+    # Set-Cookie on the response) for them
+    if (request.endpoint == "static"
+            or request.path == "/robots.txt"
+            or request.path.startswith("/uploads/")
+            or request.path.startswith(ADMIN_PATH)):
+        return
+    anon_id = request.cookies.get("aid")
+    if not anon_id:
+        # 16 random bytes base64url-encoded: 22 chars vs 32 for a hex UUID,
+        # shipped on every request. make_anon_hash is encoding-agnostic, so
+        # older hex ids keep working.
+        anon_id = base64.urlsafe_b64encode(os.urandom(16)).rstrip(b"=").decode()
+        g.new_anon_id = anon_id
+    g.anon_id = anon_id
+
+@app.after_request
+def set_anon_cookie(response):
+    if "new_anon_id" in g:
+        response.set_cookie("aid", g.new_anon_id, max_age=10 * 365 * 24 * 3600,
+                            httponly=True, samesite="Lax")
+    return response
 
 # --- Helpers ---
+# Keyed BLAKE2b replaces HMAC-SHA256: one compression pass instead of the
+# ipad/opad pair, and the 16-byte digest halves what the anon_hash/ip_hash
+# UNIQUE indexes have to store. The derivations are deterministic for the
+# life of the process (SECRET is fixed at import), so an LRU turns repeat
+# calls — returning devices, busy subnets — into dict lookups.
+@functools.lru_cache(maxsize=4096)
 def make_anon_hash(anon_id: str) -> str:
-    return hmac.new(SECRET, (anon_id or "").encode("utf-8"), hashlib.sha256).hexdigest()
+    return hashlib.blake2b((anon_id or "").encode("utf-8"), key=SECRET[:64], digest_size=16).hexdigest()
 
 def client_ip() -> str:
-    ip = request.headers.get("X-Forwarded-For", request.remote_addr or "")
-    return ip.split(",")[0].strip()
+    ip = request.headers.get("X-Forwarded-For") or request.remote_addr or ""
+    return ip.partition(",")[0].strip()
 
+@functools.lru_cache(maxsize=4096)
 def make_ip_hash(ip: str) -> str:
-    if ":" in ip:
-        parts = ip.split(":")
-        net = ":".join(parts[:4])
+    # mask to the abuse-relevant prefix (/24 for v4, a real /64 for v6 —
+    # the old first-four-hextets slice mishandled :: compression) and hash
+    # the packed prefix bytes; every vote goes through here
+    try:
+        addr = ipaddress.ip_address(ip)
+    except ValueError:
+        prefix = ip.encode("utf-8")  # unparseable input: hash it verbatim
     else:
-        parts = ip.split(".")
-        net = ".".join(parts[:3] + ["0"]) if len(parts) == 4 else ip
-    return hmac.new(SECRET, net.encode("utf-8"), hashlib.sha256).hexdigest()
+        if addr.version == 6 and addr.ipv4_mapped:
+            # ::ffff:a.b.c.d has zero upper bits, so the /64 mask would
+            # collapse every mapped-v4 client into one bucket; unwrap and
+            # treat it as the v4 address it is
+            addr = addr.ipv4_mapped
+        if addr.version == 4:
+            prefix = (int(addr) >> 8).to_bytes(3, "big")
+        else:
+            prefix = (int(addr) >> 64).to_bytes(8, "big")
+    return hashlib.blake2b(prefix, key=SECRET[:64], digest_size=16).hexdigest()
+
+# The index page only needs the caller's voted-question ids to color the
+# vote buttons, so they're mirrored into a compact cookie ("1.42.97") and
+# the 50 per-row EXISTS probes disappear. The cookie is a pure UI hint:
+# vote_question rewrites it on every toggle, and a missing, garbled or
+# overflowing cookie just falls back to one qvotes index scan.
+_QV_COOKIE = "qv"
+_QV_COOKIE_MAX = 200
+
+def _read_qv_cookie():
+    raw = request.cookies.get(_QV_COOKIE)
+    if raw is None:
+        return None
+    try:
+        return frozenset(int(part) for part in raw.split(".") if part)
+    except ValueError:
+        return None
+
+def _voted_question_ids(db, anon_hash):
+    return frozenset(row[0] for row in db.execute(
+        "SELECT question_id FROM qvotes WHERE anon_hash=?", (anon_hash,)))
+
+# Timestamps live as integer unix seconds and only become text here, at
+# render time, for the handful of rows a page actually shows.
+@app.template_filter("fmt_ts")
+def fmt_ts(ts):
+    if not isinstance(ts, (int, float)):
+        return ts  # pre-migration TEXT rows already carry the display format
+    return datetime.fromtimestamp(ts, timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
 
 # --- Templates ---
-BASE = """
-<!doctype html>
-<html lang="en">
-  <head>
-    <meta charset="utf-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1">
-    <title>Debate</title>
-    <link rel="icon" type="image/png" href="/static/e.png">
-    <script src="https://cdn.tailwindcss.com"></script>
-    <link href="https://fonts.googleapis.com/css2?family=Lora:wght@400;600;700&amp;display=swap" rel="stylesheet">
-    <link href="https://cdn.quilljs.com/1.3.7/quill.snow.css" rel="stylesheet">
-    <script src="https://cdn.quilljs.com/1.3.7/quill.js"></script>
-    <script src="https://cdn.jsdelivr.net/npm/quill-image-resize-module@3.0.0/image-resize.min.js"></script>
-    <style>
-      html, body, input, button, textarea { font-family: 'Lora', serif; }
-      .ql-container { min-height: 180px; }
-      .prose img { max-width: 100%; height: auto; }
-      /* Make inserted images in Quill editors resizable and responsive */
-      .ql-editor img {
-        max-width: none;
-        height: auto;
-        resize: both;
-        overflow: hidden;
-        display: block;
-        cursor: nwse-resize;
-        border: 1px dashed transparent;
-        transition: border-color 0.15s;
-      }
-      .ql-editor img:hover { border: 1px dashed #d1d5db; }
-      /* Vote triangle sizing */
-      .vote-tri { font-size: 0.9rem; line-height: 1; }
-      @media (max-width: 640px) { .vote-tri { font-size: 0.95rem; } }
-      .pressed { transform: translateY(1px); }
-    </style>
-  </head>
-  <body class="bg-zinc-50 text-zinc-900">
-    <div class="max-w-3xl mx-auto p-4">
-      <header class="flex items-center justify-between mb-6">
-        <a href="{{ url_for('index') }}" class="text-2xl font-bold">Debate</a>
-        <div class="flex items-center gap-2">
-          <a href="{{ url_for('ask') }}" class="inline-flex items-center px-3 py-2 rounded-xl bg-zinc-900 text-white hover:bg-zinc-800">Ask a question</a>
-          <a href="{{ url_for('suggest') }}" class="inline-flex items-center px-3 py-2 rounded-xl border border-zinc-300 hover:bg-zinc-50">Suggestions</a>
-        </div>
-      </header>
-      {{ body|safe }}
-    </div>
-
-    <script>
-      // Generic helper for vote click -> POST -> update
-      async function sendVote(btn, url) {
-        if (btn.dataset.loading === '1') return;
-        btn.dataset.loading = '1';
-        btn.classList.add('pressed');
-
-        try {
-          const res = await fetch(url, { method: 'POST', headers: { 'X-Requested-With': 'fetch' }});
-          const data = await res.json();
-          // Update count & state only after backend confirms
-          if (data && data.ok) {
-            const countEl = document.getElementById(btn.dataset.countId);
-            if (countEl) countEl.textContent = data.count;
-            // toggle active color
-            if (data.voted) {
-              btn.classList.remove('text-zinc-400');
-              btn.classList.add('text-amber-500');
-              btn.setAttribute('aria-pressed', 'true');
-            } else {
-              btn.classList.remove('text-amber-500');
-              btn.classList.add('text-zinc-400');
-              btn.setAttribute('aria-pressed', 'false');
-            }
-
-            // For "one answer per question": backend might return a moved_id to un-highlight old
-            if (data.cleared_answer_id) {
-              const prevBtn = document.querySelector(`[data-aid="${data.cleared_answer_id}"][data-kind="answer"]`);
-              if (prevBtn) {
-                prevBtn.classList.remove('text-amber-500');
-                prevBtn.classList.add('text-zinc-400');
-                prevBtn.setAttribute('aria-pressed', 'false');
-                const prevCount = document.getElementById(prevBtn.dataset.countId);
-                if (prevCount && typeof data.prev_count === 'number') prevCount.textContent = data.prev_count;
-              }
-            }
-          } else {
-            console.warn('Vote failed', data);
-          }
-        } catch (e) {
-          console.error(e);
-        } finally {
-          btn.dataset.loading = '0';
-          btn.classList.remove('pressed');
-        }
-      }
-    </script>
-  </body>
-</html>
-"""
-
-# Shared JS helpers injected where needed (toolbar + drag/drop + paste)
-QUILL_IMAGE_HELPERS = """
-<script>
-  function uploadImageFile(file, quill) {
-    const formData = new FormData();
-    formData.append('file', file);
-    return fetch('/upload_image', { method: 'POST', body: formData })
-      .then(r => r.json())
-      .then(data => {
-        if (data && data.url) {
-          const range = quill.getSelection(true);
-          quill.insertEmbed(range.index, 'image', data.url, 'user');
-          quill.setSelection(range.index + 1);
-        } else {
-          alert('Image upload failed.');
-        }
-      })
-      .catch(() => alert('Image upload failed.'));
-  }
-
-  function attachImageHandlers(quill) {
-    // Toolbar image button
-    const toolbar = quill.getModule('toolbar');
-    if (toolbar) {
-      toolbar.addHandler('image', () => {
-        const input = document.createElement('input');
-        input.setAttribute('type', 'file');
-        input.setAttribute('accept', 'image/*');
-        input.onchange = () => {
-          const file = input.files && input.files[0];
-          if (file) uploadImageFile(file, quill);
-        };
-        input.click();
-      });
-    }
-
-    // Drag & drop
-    quill.root.addEventListener('drop', function(e) {
-      e.preventDefault();
-      if (e.dataTransfer && e.dataTransfer.files && e.dataTransfer.files.length) {
-        const file = e.dataTransfer.files[0];
-        if (file && file.type.startsWith('image/')) {
-          uploadImageFile(file, quill);
-        }
-      }
-    });
-
-    // Paste images from clipboard
-    quill.root.addEventListener('paste', function(e) {
-      const items = (e.clipboardData || window.clipboardData).items;
-      if (!items) return;
-      for (let i = 0; i < items.length; i++) {
-        const it = items[i];
-        if (it.kind === 'file') {
-          const file = it.getAsFile();
-          if (file && file.type && file.type.startsWith('image/')) {
-            e.preventDefault();
-            uploadImageFile(file, quill);
-            break;
-          }
-        }
-      }
-    });
-  }
-</script>
-"""
-
-INDEX = """
-<div class="flex items-center justify-between mb-4">
-  <h1 class="text-xl font-semibold">Questions</h1>
-  <form method="get" class="flex items-center gap-2 text-sm">
-    <label class="text-zinc-600">Sort by:</label>
-    <select name="sort" onchange="this.form.submit()" class="border border-zinc-200 rounded-xl shadow-sm px-3 py-2 bg-white text-zinc-800 focus:outline-none focus:ring-2 focus:ring-zinc-300 hover:bg-zinc-100 active:bg-zinc-100 transition-all">
-      <option value="" {% if sort == '' %}selected{% endif %}>Latest activity</option>
-      <option value="recent" {% if sort == 'recent' %}selected{% endif %}>Recently posted</option>
-      <option value="bumped" {% if sort == 'bumped' %}selected{% endif %}>Bumped</option>
-      <option value="top_day" {% if sort == 'top_day' %}selected{% endif %}>Top 24h</option>
-      <option value="top_week" {% if sort == 'top_week' %}selected{% endif %}>Top 7d</option>
-      <option value="top_month" {% if sort == 'top_month' %}selected{% endif %}>Top 30d</option>
-    </select>
-  </form>
-</div>
-
-<div class="space-y-4">
-  {% for q in questions %}
-    <div class="bg-white p-4 rounded-2xl shadow-sm hover:shadow-md transition">
-      <div class="flex items-start">
-        <div class="flex-1">
-          <a href="{{ url_for('question', qid=q['id']) }}">
-            <h2 class="text-lg font-semibold">{{ q['title'] }}</h2>
-          </a>
-          {% if q['body'] %}
-            {% set preview = (q['body'] | striptags) %}
-            <p class="text-sm text-zinc-600 mt-1">{{ preview[:180] }}{% if preview|length > 180 %}…{% endif %}</p>
-          {% endif %}
-          <div class="text-xs text-zinc-500 mt-2">{{ q['created_at'] }}</div>
-        </div>
-        <div class="pl-3 text-center">
-          {% set qv_count_id = 'qv-count-' ~ q['id'] %}
-          <button
-            type="button"
-            class="vote-tri transition text-{{ 'amber-500' if q['voted'] else 'zinc-400' }}"
-            aria-pressed="{{ 'true' if q['voted'] else 'false' }}"
-            data-kind="question"
-            data-qid="{{ q['id'] }}"
-            data-count-id="{{ qv_count_id }}"
-            onclick="sendVote(this, '{{ url_for('vote_question', qid=q['id']) }}')"
-          >
-            ▲
-          </button>
-          <div id="{{ qv_count_id }}" class="text-xs mt-1">{{ q['qvotes'] or 0 }}</div>
-        </div>
-      </div>
-    </div>
-  {% else %}
-    <p class="text-zinc-600">No questions yet.</p>
-  {% endfor %}
-</div>
-"""
-
-ASK = """
-<div class="bg-white p-4 rounded-2xl shadow-sm">
-  <form id="ask-form" method="post" class="space-y-3">
-    <div>
-      <label class="block text-sm text-zinc-600">Title <span class="text-red-600">*</span></label>
-      <input name="title" required maxlength="180" class="w-full px-3 py-2 rounded-xl border border-zinc-200" />
-    </div>
-    <div>
-      <label class="block text-sm text-zinc-600">Details (optional)</label>
-      <input type="hidden" name="body" id="q-body" />
-      <div id="q-editor" class="bg-white rounded-xl border border-zinc-200"></div>
-    </div>
-    <button type="submit" class="px-3 py-2 rounded-2xl bg-zinc-900 text-white">Post question</button>
-  </form>
-
-  {{ quill_helpers|safe }}
-  <script>
-    document.addEventListener('DOMContentLoaded', function () {
-      var qEditor = new Quill('#q-editor', {
-        theme: 'snow',
-        placeholder: 'Add context, examples, or constraints…',
-        modules: {
-          toolbar: [
-            [{ 'header': [1, 2, 3, false] }],
-            [{ 'size': ['small', false, 'large', 'huge'] }],
-            ['bold', 'italic', 'underline'],
-            [{ 'list': 'ordered' }, { 'list': 'bullet' }],
-            ['blockquote', 'image', 'clean']
-          ],
-          imageResize: {
-            displaySize: true
-          }
-        }
-      });
-
-      attachImageHandlers(qEditor);
-
-      var form = document.getElementById('ask-form');
-      form.addEventListener('submit', function () {
-        var html = qEditor.root.innerHTML.trim();
-        document.getElementById('q-body').value = (html === '<p><br></p>' ? '' : html);
-      });
-    });
-  </script>
-</div>
-"""
-
-QUESTION = """
-<article class="bg-white p-5 rounded-2xl shadow-sm">
-  <div class="flex items-start">
-    <div class="flex-1">
-      <h1 class="text-2xl font-bold">{{ q['title'] }}</h1>
-      {% if q['body'] %}
-        <div class="prose prose-zinc max-w-none mt-2">{{ q['body'] | safe }}</div>
-      {% endif %}
-      <div class="text-xs text-zinc-500 mt-2">Asked {{ q['created_at'] }}</div>
-    </div>
-    <div class="pl-3 text-center">
-      {% set qv_count_id = 'qv-count-' ~ q['id'] %}
-      <button
-        type="button"
-        class="vote-tri transition text-{{ 'amber-500' if qv_voted else 'zinc-400' }}"
-        aria-pressed="{{ 'true' if qv_voted else 'false' }}"
-        data-kind="question"
-        data-qid="{{ q['id'] }}"
-        data-count-id="{{ qv_count_id }}"
-        onclick="sendVote(this, '{{ url_for('vote_question', qid=q['id']) }}')"
-      >▲</button>
-      <div id="{{ qv_count_id }}" class="text-xs mt-1">{{ qv_count or 0 }}</div>
-    </div>
-  </div>
-</article>
-
-<section class="mt-6">
-  <h2 class="text-lg font-semibold mb-2">Answers ({{ answers|length }})</h2>
-  <div class="space-y-3">
-    {% for a in answers %}
-      <div class="bg-white p-4 rounded-2xl shadow-sm">
-        <div class="flex items-start">
-          <div class="flex-1">
-            <div class="text-sm text-zinc-600">by {{ a['name'] or 'Anonymous' }}</div>
-            <div class="answer-body relative max-h-[420px] overflow-hidden" data-aid="{{ a['id'] }}" data-qid="{{ q['id'] }}">
-  <div class="prose prose-zinc max-w-none mt-1">{{ a['body'] | safe }}</div>
-  <div class="expand-overlay hidden absolute bottom-0 left-0 w-full flex justify-center pb-3">
-    <div class="px-4 py-1.5 rounded-full bg-amber-50/90 backdrop-blur-[2px] text-sm font-semibold text-amber-600 hover:bg-amber-100 border border-amber-200 shadow-sm transition">
-  View full answer ↓
-</div>
-  </div>
-</div>
-            <div class="text-xs text-zinc-500 mt-2">{{ a['created_at'] }}</div>
-          </div>
-          <div class="pl-3 text-center">
-            {% set aid = a['id'] %}
-            {% set count_id = 'av-count-' ~ aid %}
-            {% set voted = (current_answer_id == aid) %}
-            <button
-              type="button"
-              class="vote-tri transition text-{{ 'amber-500' if voted else 'zinc-400' }}"
-              aria-pressed="{{ 'true' if voted else 'false' }}"
-              data-kind="answer"
-              data-qid="{{ q['id'] }}"
-              data-aid="{{ aid }}"
-              data-count-id="{{ count_id }}"
-              onclick="sendVote(this, '{{ url_for('vote_answer', qid=q['id'], aid=aid) }}')"
-            >▲</button>
-            <div id="{{ count_id }}" class="text-xs mt-1">{{ vote_counts.get(aid, 0) }}</div>
-          </div>
-        </div>
-      </div>
-    {% else %}
-      <p class="text-zinc-600">No answers yet.</p>
-    {% endfor %}
-  </div>
-  <script>
-document.addEventListener('DOMContentLoaded', function () {
-  const observer = new IntersectionObserver((entries) => {
-    entries.forEach(entry => {
-      if (entry.isIntersecting) {
-        const el = entry.target;
-        if (!el.dataset.viewed) {
-          el.dataset.viewed = 'true';
-          setTimeout(() => {
-            if (el.getBoundingClientRect().top < window.innerHeight && el.getBoundingClientRect().bottom > 0) {
-              const qid = el.dataset.qid;
-              const aid = el.dataset.aid;
-              fetch("/log_event", {
-                method: "POST",
-                headers: {"Content-Type": "application/json"},
-                body: JSON.stringify({type: "view_answer", path: `/q/${qid}/a/${aid}`})
-              });
-            }
-          }, 5000);
-        }
-      }
-    });
-  }, {threshold: 0.5});
-
-  document.querySelectorAll('.answer-body').forEach(el => {
-    const content = el.querySelector('.prose');
-    const overlay = el.querySelector('.expand-overlay');
-    // Use fixed pixel threshold for expand overlay
-    if (content.scrollHeight > 420) {
-      overlay.classList.remove('hidden');
-      overlay.addEventListener('click', () => {
-        el.style.maxHeight = 'none';
-        overlay.remove();
-        const qid = el.dataset.qid;
-        const aid = el.dataset.aid;
-        fetch("/log_event", {
-          method: "POST",
-          headers: {"Content-Type": "application/json"},
-          body: JSON.stringify({type: "view_answer", path: `/q/${qid}/a/${aid}`})
-        });
-      });
-    } else {
-      observer.observe(el);
-    }
-  });
-});
-</script>
-</section>
-
-<section class="mt-6 bg-white p-4 rounded-2xl shadow-sm">
-  <h3 class="font-semibold">Add your answer</h3>
-  <form id="answer-form" method="post" action="{{ url_for('answer', qid=q['id']) }}" class="space-y-3">
-    <div>
-      <label class="block text-sm text-zinc-600">Display name (optional)</label>
-      <input name="name" maxlength="80" class="w-full px-3 py-2 rounded-xl border border-zinc-200" />
-    </div>
-    <div>
-      <label class="block text-sm text-zinc-600">Your answer <span class="text-red-600">*</span></label>
-      <input type="hidden" name="body" id="a-body" />
-      <div id="a-editor" class="bg-white rounded-xl border border-zinc-200"></div>
-    </div>
-    <button type="submit" class="px-3 py-2 rounded-xl bg-zinc-900 text-white">Post answer</button>
-  </form>
-
-  {{ quill_helpers|safe }}
-  <script>
-    document.addEventListener('DOMContentLoaded', function () {
-      var aEditor = new Quill('#a-editor', {
-        theme: 'snow',
-        placeholder: 'Write your answer…',
-        modules: {
-          toolbar: [
-            [{ 'header': [1, 2, 3, false] }],
-            [{ 'size': ['small', false, 'large', 'huge'] }],
-            ['bold', 'italic', 'underline'],
-            [{ 'list': 'ordered' }, { 'list': 'bullet' }],
-            ['blockquote', 'image', 'clean']
-          ],
-          imageResize: {
-            displaySize: true
-          }
-        }
-      });
-
-      attachImageHandlers(aEditor);
-
-      var form = document.getElementById('answer-form');
-      form.addEventListener('submit', function () {
-        var html = aEditor.root.innerHTML.trim();
-        document.getElementById('a-body').value = (html === '<p><br></p>' ? '' : html);
-      });
-    });
-  </script>
-</section>
-"""
-
-SUGGEST_FORM = """
-<div class="bg-white p-5 rounded-2xl shadow-sm">
-  <h1 class="text-2xl font-bold mb-3">Send a Suggestion</h1>
-  <form id="s-form" method="post" class="space-y-3">
-    <div>
-      <label class="block text-sm text-zinc-600">Suggestion <span class="text-red-600">*</span></label>
-      <input type="hidden" name="body" id="s-body">
-      <div id="s-editor" class="bg-white rounded-xl border border-zinc-200"></div>
-    </div>
-    <div>
-      <label class="block text-sm text-zinc-600">Contact (optional)</label>
-      <input name="contact" class="w-full px-3 py-2 rounded-xl border border-zinc-200" />
-    </div>
-    <button class="px-3 py-2 rounded-xl bg-zinc-900 text-white">Submit</button>
-  </form>
-
-  {{ quill_helpers|safe }}
-  <script>
-    document.addEventListener('DOMContentLoaded', function () {
-      var sEditor = new Quill('#s-editor', {
-        theme: 'snow',
-        placeholder: 'Share your feedback or suggestions…',
-        modules: {
-          toolbar: [
-            [{ 'header': [1, 2, 3, false] }],
-            ['bold', 'italic', 'underline'],
-            [{ 'list': 'ordered' }, { 'list': 'bullet' }],
-            ['blockquote', 'image', 'clean']
-          ],
-          imageResize: {
-            displaySize: true
-          }
-        }
-      });
-
-      attachImageHandlers(sEditor);
-
-      var sForm = document.getElementById('s-form');
-      sForm.addEventListener('submit', function () {
-        var html = sEditor.root.innerHTML.trim();
-        document.getElementById('s-body').value = (html === '<p><br></p>' ? '' : html);
-      });
-    });
-  </script>
-</div>
-"""
+# Pages live in templates/ as a real Jinja inheritance tree: base.html owns
+# the shell and each page fills {% block content %}. One render pass per
+# request, no inner-render string or |safe re-wrapping, and Flask caches the
+# compiled templates by filename so the parse cost is paid once per process.
+
+def render_page(template_name, **ctx):
+    """Stream a page template instead of building it as one big string.
+
+    stream_template drives the compiled template through generate(), so the
+    <head> and header flush while the rest of the page is still rendering.
+    """
+    return Response(stream_template(template_name, **ctx),
+                    content_type="text/html; charset=utf-8")
 
 # --- Routes ---
+_SORT_WINDOWS = {"top_day": "-1 day", "top_week": "-7 day", "top_month": "-30 day"}
+
 @app.route("/")
 def index():
     log_event("view", request.path)
     sort = request.args.get("sort", "").strip()
     db = get_db()
 
-    # For each question, we also want current user's question-voted state and total qvotes
-    # Build base lists differently per sort
+    # The caller's vote state comes from the qv cookie (or, when it's
+    # absent, one qvotes index scan), so the queries only carry the
+    # denormalized totals — no per-row EXISTS probes or Python enrichment.
+    voted_ids = _read_qv_cookie()
+    if voted_ids is None:
+        voted_ids = _voted_question_ids(db, make_anon_hash(g.anon_id))
+
+    # Version probe for the whole listing: last_activity_at moves on new
+    # questions and answers (trigger), the qvotes/avotes max+count pairs
+    # move on votes, and voted_ids covers the caller's own button state.
+    # Three index-only lookups buy a 304 instead of a 50-row render, and
+    # max-age=15 lets the browser skip even the revalidation briefly.
+    ver = db.execute("""
+        SELECT (SELECT COALESCE(MAX(last_activity_at), '') FROM questions),
+               (SELECT COUNT(*) FROM questions),
+               (SELECT COALESCE(MAX(created_at), '') FROM qvotes),
+               (SELECT COUNT(*) FROM qvotes),
+               (SELECT COALESCE(MAX(created_at), '') FROM avotes),
+               (SELECT COUNT(*) FROM avotes)
+    """).fetchone()
+    state = f"{sort}|{'|'.join(map(str, ver))}|{','.join(map(str, sorted(voted_ids)))}"
+    etag = hashlib.blake2b(state.encode(), digest_size=8).hexdigest()
+    if request.if_none_match.contains_weak(etag):
+        resp = Response(status=304)
+    else:
+        resp = _render_index(db, sort, voted_ids)
+    resp.set_etag(etag, weak=True)
+    resp.cache_control.private = True
+    resp.cache_control.max_age = 15
+    return resp
+
+def _render_index(db, sort, voted_ids):
     if sort in ("", "bumped"):
         qs = db.execute("""
-            SELECT q.id, q.title, q.body, q.created_at,
-                   MAX(COALESCE(a.created_at, q.created_at)) AS activity_time
+            SELECT q.id, q.title, q.preview, q.created_at,
+                   (SELECT COUNT(*) FROM answers a WHERE a.question_id = q.id) AS n_answers,
+                   q.qvotes_count AS qvotes,
+                   q.last_activity_at AS activity_time
             FROM questions q
-            LEFT JOIN answers a ON a.question_id = q.id
-            GROUP BY q.id
-            ORDER BY activity_time DESC
+            ORDER BY q.last_activity_at DESC
             LIMIT 50
         """).fetchall()
 
     elif sort == "recent":
         qs = db.execute("""
-            SELECT id, title, body, created_at
-            FROM questions
-            ORDER BY created_at DESC
+            SELECT q.id, q.title, q.preview, q.created_at,
+                   (SELECT COUNT(*) FROM answers a WHERE a.question_id = q.id) AS n_answers,
+                   q.qvotes_count AS qvotes
+            FROM questions q
+            ORDER BY q.created_at DESC
             LIMIT 50
         """).fetchall()
 
-    elif sort in ("top_day", "top_week", "top_month"):
-        days = {"top_day": 1, "top_week": 7, "top_month": 30}[sort]
+    elif sort in _SORT_WINDOWS:
+        # bound as a ? parameter so all three sorts share one prepared
+        # statement in the driver's cache
+        window = _SORT_WINDOWS[sort]
         # Combine qvotes and avotes in timeframe
-        qs = db.execute(f"""
-            SELECT q.id, q.title, q.body, q.created_at,
+        qs = db.execute("""
+            SELECT q.id, q.title, q.preview, q.created_at,
+                   (SELECT COUNT(*) FROM answers a2 WHERE a2.question_id = q.id) AS n_answers,
+                   q.qvotes_count AS qvotes,
                    COALESCE(qv.cnt, 0) + COALESCE(av.cnt, 0) AS votes
             FROM questions q
             LEFT JOIN (
                 SELECT question_id, COUNT(*) AS cnt
                 FROM qvotes
-                WHERE created_at >= datetime('now', '-{days} day')
+                WHERE created_at >= unixepoch('now', ?)
                 GROUP BY question_id
             ) qv ON qv.question_id = q.id
             LEFT JOIN (
                 SELECT a.question_id, COUNT(*) AS cnt
                 FROM avotes v
                 JOIN answers a ON a.id = v.answer_id
-                WHERE v.created_at >= datetime('now', '-{days} day')
+                WHERE v.created_at >= unixepoch('now', ?)
                 GROUP BY a.question_id
             ) av ON av.question_id = q.id
             ORDER BY votes DESC, q.created_at DESC
             LIMIT 50
-        """).fetchall()
+        """, (window, window)).fetchall()
     else:
         qs = db.execute("""
-            SELECT id, title, body, created_at
-            FROM questions
-            ORDER BY created_at DESC
+            SELECT q.id, q.title, q.preview, q.created_at,
+                   (SELECT COUNT(*) FROM answers a WHERE a.question_id = q.id) AS n_answers,
+                   q.qvotes_count AS qvotes
+            FROM questions q
+            ORDER BY q.created_at DESC
             LIMIT 50
         """).fetchall()
 
-    # enrich with vote counts and current user's state
-    anon_hash = make_anon_hash(session.get('anon_id') or "")
-    q_ids = [row['id'] for row in qs]
-    qv_counts = {}
-    qv_voted = set()
-    if q_ids:
-        placeholders = ",".join("?" * len(q_ids))
-        rows = db.execute(f"SELECT question_id, COUNT(*) c FROM qvotes WHERE question_id IN ({placeholders}) GROUP BY question_id", q_ids).fetchall()
-        qv_counts = {r['question_id']: r['c'] for r in rows}
-        rows = db.execute(f"SELECT question_id FROM qvotes WHERE anon_hash=? AND question_id IN ({placeholders})", (anon_hash, *q_ids)).fetchall()
-        qv_voted = {r['question_id'] for r in rows}
-
-    # convert to dicts with extra fields
-    enriched = []
-    for row in qs:
-        d = dict(row)
-        d['qvotes'] = qv_counts.get(row['id'], 0)
-        d['voted'] = (row['id'] in qv_voted)
-        enriched.append(d)
-
-    body = render_template_string(INDEX, questions=enriched, sort=sort)
-    return render_template_string(BASE, body=body, quill_helpers=QUILL_IMAGE_HELPERS)
+    return render_page("index.html", questions=qs, sort=sort, voted_ids=voted_ids)
 
 @app.route("/ask", methods=["GET", "POST"])
 def ask():
     if request.method == "POST":
         title = (request.form.get("title") or "").strip()
         raw_body = (request.form.get("body") or "").strip()
-        body = bleach.clean(raw_body, tags=ALLOWED_TAGS, attributes=ALLOWED_ATTRS, strip=True)
+        body = clean_html(raw_body[:MAX_BODY_LEN]) if raw_body else ""
         if not title:
             abort(400, "Title required")
         db = get_db()
-        db.execute("INSERT INTO questions(title, body, created_at) VALUES(?,?,?)", (title, body, datetime.utcnow()))
-        db.commit()
-        qid = db.execute("SELECT last_insert_rowid()").fetchone()[0]
-        return redirect(url_for("question", qid=qid))
+        with db:
+            # last_activity_at is set explicitly so DBs migrated before the
+            # column had a default behave the same as fresh ones
+            cur = db.execute("""
+                INSERT INTO questions(title, body, preview, created_at, last_activity_at)
+                VALUES(?,?,?,unixepoch(),unixepoch())
+            """, (title, body, make_preview(raw_body)))
+        return redirect(url_for("question", qid=cur.lastrowid))
     log_event("view", request.path)
-    body = render_template_string(ASK, quill_helpers=QUILL_IMAGE_HELPERS)
-    return render_template_string(BASE, body=body, quill_helpers=QUILL_IMAGE_HELPERS)
+    return render_page("ask.html")
 
 @app.route("/q/<int:qid>")
 def question(qid):
     log_event("view", request.path)
     db = get_db()
-    q = db.execute("SELECT * FROM questions WHERE id=?", (qid,)).fetchone()
+    anon_hash = make_anon_hash(g.anon_id)
+
+    # question row + its vote count + caller's vote state in one statement
+    q = db.execute("""
+        SELECT q.*, q.qvotes_count AS qv_count,
+               EXISTS(SELECT 1 FROM qvotes WHERE question_id = q.id AND anon_hash = ?) AS qv_voted
+        FROM questions q WHERE q.id = ?
+    """, (anon_hash, qid)).fetchone()
     if not q:
         abort(404)
-    answers = db.execute("SELECT * FROM answers WHERE question_id=?", (qid,)).fetchall()
 
-    # counts for answers
-    rows = db.execute("SELECT answer_id, COUNT(*) AS c FROM avotes WHERE question_id=? GROUP BY answer_id", (qid,)).fetchall()
-    vote_counts = {r['answer_id']: r['c'] for r in rows}
-
-    # current device
-    anon_hash = make_anon_hash(session.get('anon_id') or "")
-    row = db.execute("SELECT answer_id FROM avotes WHERE question_id=? AND anon_hash=?", (qid, anon_hash)).fetchone()
-    current_answer_id = row['answer_id'] if row else None
-
-    # question vote state
-    qv_count = db.execute("SELECT COUNT(*) FROM qvotes WHERE question_id=?", (qid,)).fetchone()[0]
-    qv_voted = db.execute("SELECT 1 FROM qvotes WHERE question_id=? AND anon_hash=?", (qid, anon_hash)).fetchone() is not None
-
-    body = render_template_string(QUESTION, q=q, answers=answers, vote_counts=vote_counts, current_answer_id=current_answer_id, qv_count=qv_count, qv_voted=qv_voted, quill_helpers=QUILL_IMAGE_HELPERS)
-    return render_template_string(BASE, body=body, quill_helpers=QUILL_IMAGE_HELPERS)
+    # cheap change detector: new answers bump MAX(id), new votes bump
+    # MAX(created_at), toggled-off votes change the counts. The anon hash is
+    # mixed in because the rendered page highlights the caller's own votes.
+    ver = db.execute("""
+        SELECT (SELECT COALESCE(MAX(id), 0) FROM answers WHERE question_id=?),
+               (SELECT COALESCE(MAX(created_at), '') FROM avotes WHERE question_id=?),
+               (SELECT COUNT(*) FROM avotes WHERE question_id=?)
+    """, (qid, qid, qid)).fetchone()
+    etag = f"{qid}-{ver[0]}-{ver[1]}-{ver[2]}-{q['qv_count']}-{anon_hash[:8]}"
+    if request.if_none_match.contains_weak(etag):
+        return "", 304
+
+    # answers + per-answer vote counts + caller's current vote in one statement
+    answers = db.execute("""
+        SELECT a.*, (mv.anon_hash IS NOT NULL) AS mine
+        FROM answers a
+        LEFT JOIN avotes mv ON mv.question_id = ? AND mv.answer_id = a.id AND mv.anon_hash = ?
+        WHERE a.question_id = ?
+    """, (qid, anon_hash, qid)).fetchall()
+    vote_counts = {a['id']: a['vote_count'] for a in answers}
+    current_answer_id = next((a['id'] for a in answers if a['mine']), None)
+
+    resp = render_page("question.html", q=q, answers=answers, vote_counts=vote_counts, current_answer_id=current_answer_id, qv_count=q['qv_count'], qv_voted=q['qv_voted'])
+    resp.set_etag(etag, weak=True)
+    resp.cache_control.max_age = 0
+    resp.cache_control.must_revalidate = True
+    return resp
 
 @app.route("/q/<int:qid>/answer", methods=["POST"])
 def answer(qid):
@@ -757,14 +599,14 @@ def answer(qid):
         abort(404)
     name = (request.form.get("name") or "").strip()
     raw_body = (request.form.get("body") or "").strip()
-    body = bleach.clean(raw_body, tags=ALLOWED_TAGS, attributes=ALLOWED_ATTRS, strip=True)
+    body = clean_html(raw_body[:MAX_BODY_LEN]) if raw_body else ""
     if not body:
         abort(400, "Body required")
-    db.execute(
-        "INSERT INTO answers(question_id, body, name, created_at) VALUES(?,?,?,?)",
-        (qid, body, name, datetime.utcnow()),
-    )
-    db.commit()
+    with db:
+        db.execute(
+            "INSERT INTO answers(question_id, body, name, created_at) VALUES(?,?,?,unixepoch())",
+            (qid, body, name),
+        )
     return redirect(url_for("question", qid=qid))
 
 # --- AJAX Voting ---
@@ -776,20 +618,34 @@ def vote_question(qid):
     if not db.execute("SELECT 1 FROM questions WHERE id=?", (qid,)).fetchone():
         return jsonify(ok=False, error="not_found"), 404
 
-    anon_hash = make_anon_hash(session.get('anon_id') or "")
+    anon_hash = make_anon_hash(g.anon_id)
 
-    existing = db.execute("SELECT id FROM qvotes WHERE question_id=? AND anon_hash=?", (qid, anon_hash)).fetchone()
-    if existing:
-        db.execute("DELETE FROM qvotes WHERE id=?", (existing['id'],))
-        db.commit()
-        voted = False
-    else:
-        db.execute("INSERT INTO qvotes(question_id, anon_hash, created_at) VALUES(?,?,?)", (qid, anon_hash, datetime.utcnow()))
-        db.commit()
-        voted = True
+    # toggle without a lookup: delete first, insert only when nothing was there
+    with db:
+        cur = db.execute("DELETE FROM qvotes WHERE question_id=? AND anon_hash=?", (qid, anon_hash))
+        if cur.rowcount:
+            voted = False
+        else:
+            db.execute("INSERT INTO qvotes(question_id, anon_hash, created_at) VALUES(?,?,unixepoch())", (qid, anon_hash))
+            voted = True
 
-    count = db.execute("SELECT COUNT(*) FROM qvotes WHERE question_id=?", (qid,)).fetchone()[0]
-    return jsonify(ok=True, voted=voted, count=count)
+    count = db.execute("SELECT qvotes_count FROM questions WHERE id=?", (qid,)).fetchone()[0]
+
+    # keep the qv cookie in step with the toggle so the next index render
+    # can skip the qvotes lookup entirely
+    ids = _read_qv_cookie()
+    if ids is None:
+        ids = _voted_question_ids(db, anon_hash)
+    ids = (ids | {qid}) if voted else (ids - {qid})
+    resp = jsonify(ok=True, voted=voted, count=count)
+    if len(ids) <= _QV_COOKIE_MAX:
+        resp.set_cookie(_QV_COOKIE, ".".join(map(str, sorted(ids))),
+                        max_age=10 * 365 * 24 * 3600, httponly=True, samesite="Lax")
+    else:
+        # past the cap the cookie would bloat every request; drop it and
+        # let the index fall back to the DB
+        resp.delete_cookie(_QV_COOKIE)
+    return resp
 
 @app.route("/q/<int:qid>/answer/<int:aid>/vote", methods=["POST"])
 def vote_answer(qid, aid):
@@ -798,45 +654,44 @@ def vote_answer(qid, aid):
     if not db.execute("SELECT 1 FROM answers WHERE id=? AND question_id=?", (aid, qid)).fetchone():
         return jsonify(ok=False, error="not_found"), 404
 
-    anon_hash = make_anon_hash(session.get('anon_id') or "")
+    anon_hash = make_anon_hash(g.anon_id)
     ip_hash = make_ip_hash(client_ip())
 
     # SOFT CAP: if any other anon from this /24 voted in the last day on this question, show banner (but since this is AJAX, just refuse)
     recent_other = db.execute("""
         SELECT 1 FROM avotes
-        WHERE question_id=? AND ip_hash=? AND anon_hash<>? AND created_at >= datetime('now','-1 day')
+        WHERE question_id=? AND ip_hash=? AND anon_hash<>? AND created_at >= unixepoch('now','-1 day')
         LIMIT 1
     """, (qid, ip_hash, anon_hash)).fetchone()
     if recent_other:
         # Refuse without changing UI; client keeps button state.
         return jsonify(ok=False, error="ip_cap"), 429
 
-    existing = db.execute("SELECT id, answer_id FROM avotes WHERE question_id=? AND anon_hash=?", (qid, anon_hash)).fetchone()
-
     cleared_answer_id = None
     prev_count = None
 
-    if existing:
-        if existing['answer_id'] == aid:
-            # toggle off
-            db.execute("DELETE FROM avotes WHERE id=?", (existing['id'],))
-            db.commit()
+    # toggle off: deleting the caller's vote on this exact answer needs no lookup
+    with db:
+        cur = db.execute("DELETE FROM avotes WHERE question_id=? AND anon_hash=? AND answer_id=?", (qid, anon_hash, aid))
+        if cur.rowcount:
             voted = False
         else:
-            # move vote to another answer
-            cleared_answer_id = existing['answer_id']
-            # old count after removal
-            db.execute("UPDATE avotes SET answer_id=?, ip_hash=?, created_at=? WHERE id=?", (aid, ip_hash, datetime.utcnow(), existing['id']))
-            db.commit()
+            # fresh vote or a move from another answer: one UPSERT covers both;
+            # the lookup only survives to report the cleared answer back to the UI
+            row = db.execute("SELECT answer_id FROM avotes WHERE question_id=? AND anon_hash=?", (qid, anon_hash)).fetchone()
+            cleared_answer_id = row['answer_id'] if row else None
+            db.execute("""
+                INSERT INTO avotes(question_id, answer_id, anon_hash, ip_hash, created_at) VALUES(?,?,?,?,unixepoch())
+                ON CONFLICT(question_id, anon_hash)
+                DO UPDATE SET answer_id=excluded.answer_id, ip_hash=excluded.ip_hash,
+                              created_at=unixepoch()
+            """, (qid, aid, anon_hash, ip_hash))
             voted = True
-            # recompute previous answer's count for UI correction
-            prev_count = db.execute("SELECT COUNT(*) FROM avotes WHERE question_id=? AND answer_id=?", (qid, cleared_answer_id)).fetchone()[0]
-    else:
-        db.execute("INSERT INTO avotes(question_id, answer_id, anon_hash, ip_hash, created_at) VALUES(?,?,?,?,?)", (qid, aid, anon_hash, ip_hash, datetime.utcnow()))
-        db.commit()
-        voted = True
+            if cleared_answer_id is not None:
+                # previous answer's maintained count for UI correction
+                prev_count = db.execute("SELECT vote_count FROM answers WHERE id=?", (cleared_answer_id,)).fetchone()[0]
 
-    count = db.execute("SELECT COUNT(*) FROM avotes WHERE question_id=? AND answer_id=?", (qid, aid)).fetchone()[0]
+    count = db.execute("SELECT vote_count FROM answers WHERE id=?", (aid,)).fetchone()[0]
     return jsonify(ok=True, voted=voted, count=count, cleared_answer_id=cleared_answer_id, prev_count=prev_count)
 
 # --- Suggestions ---
@@ -847,17 +702,16 @@ def suggest():
     if request.method == "POST":
         raw_body = (request.form.get("body") or "").strip()
         contact = (request.form.get("contact") or "").strip()
-        body = bleach.clean(raw_body, tags=ALLOWED_TAGS, attributes=ALLOWED_ATTRS, strip=True)
+        body = clean_html(raw_body[:MAX_BODY_LEN]) if raw_body else ""
         if not body:
             abort(400, "Suggestion text required")
-        db.execute("INSERT INTO suggestions(body, contact, created_at) VALUES(?,?,?)",
-                   (body, contact, datetime.utcnow()))
-        db.commit()
+        with db:
+            db.execute("INSERT INTO suggestions(body, contact, created_at) VALUES(?,?,unixepoch())",
+                       (body, contact))
         return redirect(url_for("index"))
 
     log_event("view", request.path)
-    body_html = render_template_string(SUGGEST_FORM, quill_helpers=QUILL_IMAGE_HELPERS)
-    return render_template_string(BASE, body=body_html, quill_helpers=QUILL_IMAGE_HELPERS)
+    return render_page("suggest.html")
 
 @app.route("/log_event", methods=["POST"])
 def log_event_api():
@@ -867,23 +721,51 @@ def log_event_api():
     if not etype:
         return {"error": "missing type"}, 400
     db = get_db()
-    db.execute(
-        "INSERT INTO analytics(event_type, path, ip_hash, created_at) VALUES(?,?,?,?)",
-        (etype, path, make_ip_hash(client_ip()), datetime.utcnow()),
-    )
-    db.commit()
+    with db:
+        db.execute(
+            "INSERT INTO analytics(event_type, path, ip_hash, created_at) VALUES(?,?,?,unixepoch())",
+            (etype, path, make_ip_hash(client_ip())),
+        )
     return {"ok": True}
 
+# body/status/headers built once; Flask still wraps a fresh Response per
+# request, which after_request hooks are free to mutate
+_ROBOTS = (f"User-agent: *\nDisallow: {ADMIN_PATH}\n".encode(), 200,
+           {"Content-Type": "text/plain"})
+
 @app.route("/robots.txt")
 def robots():
-    return f"User-agent: *\nDisallow: {ADMIN_PATH}\n", 200, {"Content-Type": "text/plain"}
+    return _ROBOTS
 
 from admin_app import admin_bp
 app.register_blueprint(admin_bp, url_prefix=ADMIN_PATH)
 
+# Schema setup runs once per process (gunicorn imports this module; the
+# dev-server path below goes through the same code).
+os.makedirs(os.path.dirname(DB_PATH) or ".", exist_ok=True)
+with app.app_context():
+    init_db()
+
 # --- Image Uploads ---
+# magic-byte prefixes for the formats we accept (imghdr is deprecated)
+_IMAGE_MAGICS = (
+    b"\x89PNG\r\n\x1a\n",
+    b"\xff\xd8\xff",  # JPEG
+    b"GIF87a",
+    b"GIF89a",
+)
+
+def _looks_like_image(head: bytes) -> bool:
+    if head.startswith(_IMAGE_MAGICS):
+        return True
+    return head[:4] == b"RIFF" and head[8:12] == b"WEBP"
+
 @app.route("/upload_image", methods=["POST"])
 def upload_image():
+    # refuse before reading anything when the declared size is over budget
+    if request.content_length and request.content_length > app.config["MAX_CONTENT_LENGTH"]:
+        return {"error": "File too large"}, 413
+
     file = request.files.get("file")
     if not file:
         return {"error": "No file provided"}, 400
@@ -896,23 +778,43 @@ def upload_image():
     if ext not in allowed:
         return {"error": "Invalid file type"}, 400
 
+    # extensions lie; check the magic bytes before touching disk
+    head = file.stream.read(16)
+    if not _looks_like_image(head):
+        return {"error": "Invalid image data"}, 400
+
     os.makedirs(UPLOAD_DIR, exist_ok=True)
-    filename = f"{uuid.uuid4().hex}.{ext}"
+    # stream in 1MB chunks instead of letting FileStorage buffer the body,
+    # hashing as we go: the final name is the BLAKE2b of the content, so a
+    # re-pasted image dedupes to one file and one stable, cacheable URL
+    hasher = hashlib.blake2b(head, digest_size=16)
+    tmp_path = os.path.join(UPLOAD_DIR, f".tmp-{uuid.uuid4().hex}")
+    with open(tmp_path, "wb") as fh:
+        fh.write(head)
+        while chunk := file.stream.read(1 << 20):
+            hasher.update(chunk)
+            fh.write(chunk)
+    filename = f"{hasher.hexdigest()}.{ext}"
     path = os.path.join(UPLOAD_DIR, filename)
-    file.save(path)
+    if os.path.exists(path):
+        os.unlink(tmp_path)  # already stored; drop the duplicate bytes
+    else:
+        os.replace(tmp_path, path)
 
-    return {"url": f"/uploads/{filename}"}
+    # filename is hex + a vetted extension, so the JSON can be assembled
+    # directly instead of paying dict + jsonify serialization
+    return Response(f'{{"url": "/uploads/{filename}"}}', mimetype="application/json")
 
 @app.route("/uploads/<path:filename>")
 def serve_upload(filename):
-    return send_from_directory(UPLOAD_DIR, filename)
+    # conditional=True gives 304s and Range support; upload names are
+    # immutable so the long SEND_FILE_MAX_AGE_DEFAULT is safe here too
+    return send_from_directory(UPLOAD_DIR, filename, conditional=True)
 
 
 
 # --- Entry ---
 if __name__ == "__main__":
-    os.makedirs(os.path.dirname(DB_PATH) or ".", exist_ok=True)
     os.makedirs(UPLOAD_DIR, exist_ok=True)
-    with app.app_context():
-        init_db()
-    app.run(debug=True, host="0.0.0.0", port=int(os.environ.get("PORT", 5001)))
\ No newline at end of file
+    app.run(debug=os.environ.get("DEBUG") == "1",
+            host="0.0.0.0", port=int(os.environ.get("PORT", 5001)))
\ No newline at end of file
@@ -1,7 +1,10 @@
 # admin.py
 import os, sqlite3
+import threading
+import atexit
 from datetime import datetime
-from flask import Blueprint, g, request, Response, render_template_string, redirect, url_for
+import jinja2
+from flask import Blueprint, request, Response, redirect, url_for, stream_with_context
 
 # --- Admin config (set via env on Render/local) ---
 ADMIN_USER = os.environ.get("ADMIN_USER", "admin")
@@ -12,17 +15,42 @@ DB_PATH = os.environ.get("QA_DB_PATH", "qa.sqlite3")
 admin_bp = Blueprint("admin", __name__)
 
 # --- DB helper reusing the same SQLite file ---
+# One long-lived connection per worker thread instead of a fresh connect
+# (and WAL handshake) on every request.
+_local = threading.local()
+_all_conns = []
+_conns_lock = threading.Lock()
+
 def get_db():
-    if "admin_db" not in g:
-        g.admin_db = sqlite3.connect(DB_PATH, detect_types=sqlite3.PARSE_DECLTYPES)
-        g.admin_db.row_factory = sqlite3.Row
-    return g.admin_db
+    db = getattr(_local, "db", None)
+    if db is None:
+        # no detect_types: timestamps are plain integers now, and legacy DBs
+        # still declare those columns TIMESTAMP, which would send the integer
+        # through sqlite3's datetime converter and crash the listings
+        db = sqlite3.connect(DB_PATH, check_same_thread=False)
+        db.row_factory = sqlite3.Row
+        db.executescript("""
+            PRAGMA journal_mode=WAL;
+            PRAGMA synchronous=NORMAL;
+            PRAGMA temp_store=MEMORY;
+            PRAGMA mmap_size=268435456;
+            PRAGMA cache_size=-64000;
+            PRAGMA busy_timeout=5000;
+        """)
+        _local.db = db
+        with _conns_lock:
+            _all_conns.append(db)
+    return db
 
-@admin_bp.teardown_request
-def close_db(error=None):
-    db = g.pop("admin_db", None)
-    if db is not None:
-        db.close()
+@atexit.register
+def _close_conns():
+    with _conns_lock:
+        for db in _all_conns:
+            try:
+                db.close()
+            except sqlite3.Error:
+                pass
+        _all_conns.clear()
 
 # --- Basic Auth ---
 def check_auth(auth_header: str) -> bool:
@@ -85,57 +113,45 @@ ADMIN_BASE = """
         </div>
         <div class="text-sm text-zinc-500">{{ now }}</div>
       </header>
-      {{ body|safe }}
+      {% block content %}{% endblock %}
     </div>
   </body>
 </html>
 """
 
-def render_admin(body_template: str, **context):
-    inner = render_template_string(body_template, **context)
-    return render_template_string(ADMIN_BASE, body=inner, now=datetime.utcnow())
+# Compile the admin templates once at import; the old per-request
+# render_template_string calls re-parsed identical source every hit.
+_env = jinja2.Environment(loader=jinja2.DictLoader({}), autoescape=True)
+_env.globals["url_for"] = url_for
 
-@admin_bp.route("/", endpoint="dashboard")
-def dashboard():
-    db = get_db()
-    q_count = db.execute("SELECT COUNT(*) FROM questions").fetchone()[0]
-    a_count = db.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
-    v_count = db.execute("SELECT COUNT(*) FROM votes").fetchone()[0]
-    suggestions_count = db.execute("SELECT COUNT(*) FROM suggestions").fetchone()[0]
-    body = f"""
+DASHBOARD = """{% extends "admin_base.html" %}
+{% block content %}
     <div class="grid grid-cols-1 md:grid-cols-4 gap-4">
-      <div class="bg-white p-4 rounded-2xl shadow"><div class="text-sm text-zinc-500">Questions</div><div class="text-3xl font-bold">{q_count}</div></div>
-      <div class="bg-white p-4 rounded-2xl shadow"><div class="text-sm text-zinc-500">Answers</div><div class="text-3xl font-bold">{a_count}</div></div>
-      <div class="bg-white p-4 rounded-2xl shadow"><div class="text-sm text-zinc-500">Votes</div><div class="text-3xl font-bold">{v_count}</div></div>
-      <div class="bg-white p-4 rounded-2xl shadow"><div class="text-sm text-zinc-500">Suggestions</div><div class="text-3xl font-bold">{suggestions_count}</div></div>
+      <div class="bg-white p-4 rounded-2xl shadow"><div class="text-sm text-zinc-500">Questions</div><div class="text-3xl font-bold">{{ q_count }}</div></div>
+      <div class="bg-white p-4 rounded-2xl shadow"><div class="text-sm text-zinc-500">Answers</div><div class="text-3xl font-bold">{{ a_count }}</div></div>
+      <div class="bg-white p-4 rounded-2xl shadow"><div class="text-sm text-zinc-500">Votes</div><div class="text-3xl font-bold">{{ v_count }}</div></div>
+      <div class="bg-white p-4 rounded-2xl shadow"><div class="text-sm text-zinc-500">Suggestions</div><div class="text-3xl font-bold">{{ suggestions_count }}</div></div>
     </div>
     <div class="mt-6 flex gap-2">
-      <a href="{url_for('admin.questions')}" class="px-3 py-2 rounded-xl border">Manage Questions</a>
-      <a href="{url_for('admin.answers')}" class="px-3 py-2 rounded-xl border">Manage Answers</a>
-      <a href="{url_for('admin.suggestions')}" class="px-3 py-2 rounded-xl border">Manage Suggestions</a>
+      <a href="{{ url_for('admin.questions') }}" class="px-3 py-2 rounded-xl border">Manage Questions</a>
+      <a href="{{ url_for('admin.answers') }}" class="px-3 py-2 rounded-xl border">Manage Answers</a>
+      <a href="{{ url_for('admin.suggestions') }}" class="px-3 py-2 rounded-xl border">Manage Suggestions</a>
     </div>
-    """
-    return render_admin(body)
+{% endblock %}
+"""
 
-@admin_bp.route("/questions")
-def questions():
-    db = get_db()
-    rows = db.execute("""
-      SELECT q.id, q.title, q.created_at,
-             (SELECT COUNT(*) FROM answers a WHERE a.question_id=q.id) AS answers
-      FROM questions q
-      ORDER BY q.id DESC
-      LIMIT 200
-    """).fetchall()
-    body = """
+QUESTIONS = """{% extends "admin_base.html" %}
+{% block content %}
     <div class="bg-white p-4 rounded-2xl shadow">
       <h2 class="text-lg font-bold mb-3">Questions</h2>
+      {% set ns = namespace(last=none) %}
       <table class="w-full text-sm">
         <thead><tr class="text-left text-zinc-500">
           <th class="py-2">ID</th><th>Title</th><th>Answers</th><th>Created</th><th></th>
         </tr></thead>
         <tbody>
         {% for r in rows %}
+          {% set ns.last = r['id'] %}
           <tr class="border-t">
             <td class="py-2">{{ r['id'] }}</td>
             <td class="pr-4">{{ r['title'] }}</td>
@@ -151,28 +167,25 @@ def questions():
         {% endfor %}
         </tbody>
       </table>
+      {% if ns.last is not none %}
+        <div class="mt-3 text-sm"><a class="text-zinc-600 hover:underline" href="{{ url_for('admin.questions', before=ns.last) }}">Older &rarr;</a></div>
+      {% endif %}
     </div>
-    """
-    return render_admin(body, rows=rows)
+{% endblock %}
+"""
 
-@admin_bp.route("/answers")
-def answers():
-    db = get_db()
-    rows = db.execute("""
-      SELECT a.id, a.body, a.name, a.created_at, a.question_id
-      FROM answers a
-      ORDER BY a.id DESC
-      LIMIT 200
-    """).fetchall()
-    body = """
+ANSWERS = """{% extends "admin_base.html" %}
+{% block content %}
     <div class="bg-white p-4 rounded-2xl shadow">
       <h2 class="text-lg font-bold mb-3">Latest Answers</h2>
+      {% set ns = namespace(last=none) %}
       <table class="w-full text-sm">
         <thead><tr class="text-left text-zinc-500">
           <th class="py-2">ID</th><th>Excerpt</th><th>Name</th><th>Question</th><th>Created</th><th></th>
         </tr></thead>
         <tbody>
         {% for r in rows %}
+          {% set ns.last = r['id'] %}
           <tr class="border-t">
             <td class="py-2">{{ r['id'] }}</td>
             <td class="pr-4">{{ r['body'][:120] }}{% if r['body']|length>120 %}…{% endif %}</td>
@@ -189,28 +202,25 @@ def answers():
         {% endfor %}
         </tbody>
       </table>
+      {% if ns.last is not none %}
+        <div class="mt-3 text-sm"><a class="text-zinc-600 hover:underline" href="{{ url_for('admin.answers', before=ns.last) }}">Older &rarr;</a></div>
+      {% endif %}
     </div>
-    """
-    return render_admin(body, rows=rows)
+{% endblock %}
+"""
 
-@admin_bp.route("/suggestions")
-def suggestions():
-    db = get_db()
-    rows = db.execute("""
-      SELECT id, body, contact, created_at
-      FROM suggestions
-      ORDER BY id DESC
-      LIMIT 500
-    """).fetchall()
-    body = """
+SUGGESTIONS = """{% extends "admin_base.html" %}
+{% block content %}
     <div class="bg-white p-4 rounded-2xl shadow">
       <h2 class="text-lg font-bold mb-3">Suggestions</h2>
+      {% set ns = namespace(last=none) %}
       <table class="w-full text-sm">
         <thead><tr class="text-left text-zinc-500">
           <th class="py-2">ID</th><th>Excerpt</th><th>Contact</th><th>Created</th><th></th>
         </tr></thead>
         <tbody>
         {% for r in rows %}
+          {% set ns.last = r['id'] %}
           <tr class="border-t">
             <td class="py-2">{{ r['id'] }}</td>
             <td class="pr-4">{{ r['body'][:120] }}{% if r['body']|length>120 %}…{% endif %}</td>
@@ -225,20 +235,15 @@ def suggestions():
         {% endfor %}
         </tbody>
       </table>
+      {% if ns.last is not none %}
+        <div class="mt-3 text-sm"><a class="text-zinc-600 hover:underline" href="{{ url_for('admin.suggestions', before=ns.last) }}">Older &rarr;</a></div>
+      {% endif %}
     </div>
-    """
-    return render_admin(body, rows=rows)
+{% endblock %}
+"""
 
-# --- Analytics route ---
-@admin_bp.route("/analytics")
-def analytics():
-    db = get_db()
-    # Totals
-    q_total = db.execute("SELECT COUNT(*) AS c FROM questions").fetchone()["c"]
-    a_total = db.execute("SELECT COUNT(*) AS c FROM answers").fetchone()["c"]
-    v_total = db.execute("SELECT COUNT(*) AS c FROM votes").fetchone()["c"]
-    s_total = db.execute("SELECT COUNT(*) AS c FROM suggestions").fetchone()["c"]
-    body = """
+ANALYTICS = """{% extends "admin_base.html" %}
+{% block content %}
     <div class="grid grid-cols-2 md:grid-cols-4 gap-4 mb-6">
       <div class="bg-white p-4 rounded-2xl shadow"><div class="text-sm text-zinc-500">Questions</div><div class="text-3xl font-bold">{{ q_total }}</div></div>
       <div class="bg-white p-4 rounded-2xl shadow"><div class="text-sm text-zinc-500">Answers</div><div class="text-3xl font-bold">{{ a_total }}</div></div>
@@ -249,8 +254,97 @@ def analytics():
       <h2 class="text-lg font-bold mb-3">Activity (last 30 days)</h2>
       <p class="text-sm text-zinc-600">Detailed charts coming next. For now this page confirms the route works and totals are visible.</p>
     </div>
-    """
-    return render_admin(body, q_total=q_total, a_total=a_total, v_total=v_total, s_total=s_total)
+{% endblock %}
+"""
+
+_env.loader.mapping["admin_base.html"] = ADMIN_BASE
+_DASHBOARD_T = _env.from_string(DASHBOARD)
+_QUESTIONS_T = _env.from_string(QUESTIONS)
+_ANSWERS_T = _env.from_string(ANSWERS)
+_SUGGESTIONS_T = _env.from_string(SUGGESTIONS)
+_ANALYTICS_T = _env.from_string(ANALYTICS)
+
+def render_admin(tpl, **context):
+    return tpl.render(now=datetime.utcnow(), **context)
+
+def stream_admin(tpl, **context):
+    # listings hand a live cursor straight to the template: the client gets
+    # the top of the table while SQLite is still stepping rows, and the page
+    # never exists as one big string
+    stream = tpl.stream(now=datetime.utcnow(), **context)
+    stream.enable_buffering(5)
+    return Response(stream_with_context(stream), mimetype="text/html")
+
+@admin_bp.route("/", endpoint="dashboard")
+def dashboard():
+    db = get_db()
+    # one statement instead of four execute/fetch round-trips
+    q_count, a_count, v_count, suggestions_count = db.execute("""
+        SELECT (SELECT COUNT(*) FROM questions),
+               (SELECT COUNT(*) FROM answers),
+               (SELECT COUNT(*) FROM votes),
+               (SELECT COUNT(*) FROM suggestions)
+    """).fetchone()
+    return render_admin(_DASHBOARD_T, q_count=q_count, a_count=a_count,
+                        v_count=v_count, suggestions_count=suggestions_count)
+
+@admin_bp.route("/questions")
+def questions():
+    db = get_db()
+    # keyset pagination: the id < ? probe is one primary-key seek however
+    # deep the admin pages
+    before = request.args.get("before", type=int)
+    # one grouped aggregation over answers instead of a dependent subquery
+    # per returned question row
+    rows = db.execute(f"""
+      SELECT q.id, q.title, datetime(q.created_at, 'unixepoch') AS created_at, COALESCE(s.c, 0) AS answers
+      FROM questions q
+      LEFT JOIN (SELECT question_id, COUNT(*) AS c FROM answers GROUP BY question_id) s
+        ON s.question_id = q.id
+      {"WHERE q.id < ?" if before else ""}
+      ORDER BY q.id DESC
+      LIMIT 50
+    """, (before,) if before else ())
+    return stream_admin(_QUESTIONS_T, rows=rows)
+
+@admin_bp.route("/answers")
+def answers():
+    db = get_db()
+    before = request.args.get("before", type=int)
+    rows = db.execute(f"""
+      SELECT a.id, a.body, a.name, datetime(a.created_at, 'unixepoch') AS created_at, a.question_id
+      FROM answers a
+      {"WHERE a.id < ?" if before else ""}
+      ORDER BY a.id DESC
+      LIMIT 50
+    """, (before,) if before else ())
+    return stream_admin(_ANSWERS_T, rows=rows)
+
+@admin_bp.route("/suggestions")
+def suggestions():
+    db = get_db()
+    before = request.args.get("before", type=int)
+    rows = db.execute(f"""
+      SELECT id, body, contact, datetime(created_at, 'unixepoch') AS created_at
+      FROM suggestions
+      {"WHERE id < ?" if before else ""}
+      ORDER BY id DESC
+      LIMIT 50
+    """, (before,) if before else ())
+    return stream_admin(_SUGGESTIONS_T, rows=rows)
+
+# --- Analytics route ---
+@admin_bp.route("/analytics")
+def analytics():
+    db = get_db()
+    # Totals, batched the same way as the dashboard
+    q_total, a_total, v_total, s_total = db.execute("""
+        SELECT (SELECT COUNT(*) FROM questions),
+               (SELECT COUNT(*) FROM answers),
+               (SELECT COUNT(*) FROM votes),
+               (SELECT COUNT(*) FROM suggestions)
+    """).fetchone()
+    return render_admin(_ANALYTICS_T, q_total=q_total, a_total=a_total, v_total=v_total, s_total=s_total)
 
 # --- destructive actions (POST only) ---
 
@@ -1,6 +1,10 @@
 import os
 import sqlite3
-from flask import Blueprint, render_template_string, request, redirect, url_for, g
+import threading
+import atexit
+import time
+import jinja2
+from flask import Blueprint, Response, request, redirect, url_for, stream_with_context
 
 # Use the same DB as the main app without importing it (avoids circular import)
 DB_PATH = os.environ.get("QA_DB_PATH", "/var/data/qa.sqlite3")
@@ -8,12 +12,47 @@ DB_PATH = os.environ.get("QA_DB_PATH", "/var/data/qa.sqlite3")
 admin_bp = Blueprint("admin", __name__)  # url_prefix is set in Ego.py register_blueprint
 
 # ---------- DB helpers ----------
+# One long-lived connection per worker thread, same as the main app: no
+# open/WAL-handshake per admin hit, and the page cache survives requests.
+_local = threading.local()
+_all_conns = []
+_conns_lock = threading.Lock()
+
 def get_db():
-    if "admin_db" not in g:
-        g.admin_db = sqlite3.connect(DB_PATH, detect_types=sqlite3.PARSE_DECLTYPES)
-        g.admin_db.row_factory = sqlite3.Row
-        ensure_min_tables(g.admin_db)
-    return g.admin_db
+    db = getattr(_local, "db", None)
+    if db is None:
+        # check_same_thread=False only so the atexit hook may close them;
+        # each connection stays with its owning thread.
+        # timestamps are plain integers now; detect_types would only pay
+        # declared-type sniffing per fetched row for nothing
+        db = sqlite3.connect(DB_PATH, check_same_thread=False)
+        db.row_factory = sqlite3.Row
+        # same tuning as the main app's connections: WAL + NORMAL drop the
+        # per-commit fsync, and the cache/mmap settings keep the dashboard's
+        # COUNT(*) scans off the disk
+        db.executescript("""
+            PRAGMA journal_mode=WAL;
+            PRAGMA synchronous=NORMAL;
+            PRAGMA temp_store=MEMORY;
+            PRAGMA mmap_size=268435456;
+            PRAGMA cache_size=-64000;
+            PRAGMA busy_timeout=5000;
+        """)
+        ensure_min_tables(db)
+        _local.db = db
+        with _conns_lock:
+            _all_conns.append(db)
+    return db
+
+@atexit.register
+def _close_conns():
+    with _conns_lock:
+        for db in _all_conns:
+            try:
+                db.close()
+            except sqlite3.Error:
+                pass
+        _all_conns.clear()
 
 def ensure_min_tables(db):
     # Make sure analytics exists. (Main app also creates; this is a safe guard.)
@@ -23,19 +62,13 @@ def ensure_min_tables(db):
             event_type TEXT NOT NULL,
             path TEXT,
             ip_hash TEXT,
-            created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+            created_at INTEGER NOT NULL DEFAULT (unixepoch())
         );
         CREATE INDEX IF NOT EXISTS idx_analytics_event_time
             ON analytics(event_type, created_at);
     """)
     db.commit()
 
-@admin_bp.teardown_app_request
-def close_db(exception):
-    db = g.pop("admin_db", None)
-    if db is not None:
-        db.close()
-
 # ---------- Tiny base template ----------
 ADMIN_BASE = """
 <!doctype html>
@@ -68,26 +101,21 @@ ADMIN_BASE = """
           <a href="{{ url_for('admin.analytics') }}">Analytics</a>
         </nav>
       </header>
-      {{ body|safe }}
+      {% block content %}{% endblock %}
     </div>
   </body>
 </html>
 """
 
-# ---------- Routes ----------
-@admin_bp.route("/")
-def dashboard():
-    db = get_db()
-    totals = db.execute("""
-        SELECT
-          (SELECT COUNT(*) FROM questions)       AS questions,
-          (SELECT COUNT(*) FROM answers)         AS answers,
-          (SELECT COUNT(*) FROM qvotes)          AS qvotes,
-          (SELECT COUNT(*) FROM avotes)          AS avotes,
-          (SELECT COUNT(*) FROM suggestions)     AS suggestions,
-          (SELECT COUNT(*) FROM analytics)       AS events
-    """).fetchone()
-    body = render_template_string("""
+# Compile every admin template once at import instead of re-lexing and
+# re-parsing the same source on each request. A standalone environment
+# keeps this module importable without an app context; url_for resolves
+# at render time inside the request.
+_env = jinja2.Environment(loader=jinja2.DictLoader({}), autoescape=True)
+_env.globals["url_for"] = url_for
+
+DASHBOARD = """{% extends "admin_base.html" %}
+{% block content %}
       <div class="grid md:grid-cols-3 gap-4">
         <div class="card"><div class="text-sm text-zinc-500">Questions</div><div class="text-2xl font-bold">{{ t['questions'] }}</div></div>
         <div class="card"><div class="text-sm text-zinc-500">Answers</div><div class="text-2xl font-bold">{{ t['answers'] }}</div></div>
@@ -96,27 +124,19 @@ def dashboard():
         <div class="card"><div class="text-sm text-zinc-500">Suggestions</div><div class="text-2xl font-bold">{{ t['suggestions'] }}</div></div>
         <div class="card"><div class="text-sm text-zinc-500">Analytics events</div><div class="text-2xl font-bold">{{ t['events'] }}</div></div>
       </div>
-    """, t=totals)
-    return render_template_string(ADMIN_BASE, body=body)
+{% endblock %}
+"""
 
-@admin_bp.route("/questions")
-def questions():
-    db = get_db()
-    rows = db.execute("""
-        SELECT q.id, q.title, q.created_at, COUNT(a.id) AS acount
-        FROM questions q
-        LEFT JOIN answers a ON a.question_id = q.id
-        GROUP BY q.id
-        ORDER BY q.created_at DESC
-        LIMIT 200
-    """).fetchall()
-    body = render_template_string("""
+QUESTIONS = """{% extends "admin_base.html" %}
+{% block content %}
       <div class="card">
         <h2 class="text-xl font-semibold mb-3">Questions</h2>
+        {% set ns = namespace(last=none) %}
         <table>
           <thead><tr><th>ID</th><th>Title</th><th>Answers</th><th>Created</th><th></th></tr></thead>
           <tbody>
             {% for r in rows %}
+              {% set ns.last = r['id'] %}
               <tr>
                 <td class="mono">{{ r['id'] }}</td>
                 <td>{{ r['title'] }}</td>
@@ -127,54 +147,22 @@ def questions():
             {% endfor %}
           </tbody>
         </table>
+        {% if ns.last is not none %}
+          <div class="mt-3 text-sm"><a class="text-zinc-600 hover:underline" href="{{ url_for('admin.questions', before=ns.last) }}">Older &rarr;</a></div>
+        {% endif %}
       </div>
-    """, rows=rows)
-    return render_template_string(ADMIN_BASE, body=body)
-
-@admin_bp.route("/delete-question/<int:qid>")
-def delete_question(qid):
-    db = get_db()
-    db.execute("DELETE FROM questions WHERE id=?", (qid,))
-    db.commit()
-    return redirect(url_for("admin.questions"))
-
-@admin_bp.route("/delete-answer/<int:aid>")
-def delete_answer(aid):
-    db = get_db()
-    db.execute("DELETE FROM answers WHERE id=?", (aid,))
-    db.commit()
-    return redirect(url_for("admin.answers"))
-
-@admin_bp.route("/answers")
-def answers():
-    db = get_db()
-    rows = db.execute("""
-        SELECT a.id, a.question_id, a.name, a.body, a.created_at
-        FROM answers a
-        ORDER BY a.created_at DESC
-        LIMIT 200
-    """).fetchall()
-
-    # Make a simple text excerpt without HTML for display
-    cleaned = []
-    for r in rows:
-        text = (r["body"] or "")
-        # naive strip tags for preview
-        text = text.replace("<", " ").replace(">", " ")
-        cleaned.append({
-            "id": r["id"],
-            "question_id": r["question_id"],
-            "name": r["name"],
-            "excerpt": text[:120],
-            "created_at": r["created_at"],
-        })
+{% endblock %}
+"""
 
-    body = render_template_string("""
+ANSWERS = """{% extends "admin_base.html" %}
+{% block content %}
       <div class="card">
         <h2 class="text-xl font-semibold mb-3">Recent answers</h2>
+        {% set ns = namespace(last=none) %}
         <table>
 <thead><tr><th>ID</th><th>QID</th><th>Name</th><th>Excerpt</th><th>Created</th><th></th></tr></thead>          <tbody>
             {% for r in rows %}
+              {% set ns.last = r.id %}
               <tr>
                 <td class="mono">{{ r.id }}</td>
                 <td class="mono">{{ r.question_id }}</td>
@@ -192,99 +180,15 @@ def answers():
             {% endfor %}
           </tbody>
         </table>
+        {% if ns.last is not none %}
+          <div class="mt-3 text-sm"><a class="text-zinc-600 hover:underline" href="{{ url_for('admin.answers', before=ns.last) }}">Older &rarr;</a></div>
+        {% endif %}
       </div>
-    """, rows=cleaned)
-    return render_template_string(ADMIN_BASE, body=body)
-
-@admin_bp.route("/analytics")
-def analytics():
-    """
-    Shows three analytics sections:
-      1. Feed views (event_type='feed_view')
-      2. Question views (event_type='view'), filterable by question ID
-      3. Answer views (event_type='view_answer'), filterable by answer ID
-    Each with its own date range and filter form, summary, and Chart.js chart.
-    """
-    db = get_db()
-
-    # Feed views filters
-    feed_start = (request.args.get("feed_start") or "").strip()
-    feed_end = (request.args.get("feed_end") or "").strip()
-    feed_where = ["event_type = 'feed_view'"]
-    feed_params = []
-    if feed_start:
-        feed_where.append("date(created_at) >= date(?)")
-        feed_params.append(feed_start)
-    if feed_end:
-        feed_where.append("date(created_at) <= date(?)")
-        feed_params.append(feed_end)
-    feed_where_sql = "WHERE " + " AND ".join(feed_where)
-    feed_rows = db.execute(f"""
-        SELECT date(created_at) AS d, COUNT(*) AS c
-        FROM analytics
-        {feed_where_sql}
-        GROUP BY date(created_at)
-        ORDER BY d ASC
-    """, feed_params).fetchall()
-    feed_total = sum(r["c"] for r in feed_rows)
-    feed_labels = [r["d"] for r in feed_rows]
-    feed_values = [r["c"] for r in feed_rows]
-
-    # Question views filters
-    q_start = (request.args.get("q_start") or "").strip()
-    q_end = (request.args.get("q_end") or "").strip()
-    qid = request.args.get("q_qid", type=int)
-    q_where = ["event_type = 'view'"]
-    q_params = []
-    if qid:
-        q_where.append("(path = ? OR path LIKE ?)")
-        q_params.extend((f"/q/{qid}", f"/q/{qid}/%"))
-    if q_start:
-        q_where.append("date(created_at) >= date(?)")
-        q_params.append(q_start)
-    if q_end:
-        q_where.append("date(created_at) <= date(?)")
-        q_params.append(q_end)
-    q_where_sql = "WHERE " + " AND ".join(q_where)
-    q_rows = db.execute(f"""
-        SELECT date(created_at) AS d, COUNT(*) AS c
-        FROM analytics
-        {q_where_sql}
-        GROUP BY date(created_at)
-        ORDER BY d ASC
-    """, q_params).fetchall()
-    q_total = sum(r["c"] for r in q_rows)
-    q_labels = [r["d"] for r in q_rows]
-    q_values = [r["c"] for r in q_rows]
-
-    # Answer views filters
-    a_start = (request.args.get("a_start") or "").strip()
-    a_end = (request.args.get("a_end") or "").strip()
-    aid = request.args.get("a_aid", type=int)
-    a_where = ["event_type = 'view_answer'"]
-    a_params = []
-    if aid:
-        a_where.append("(path LIKE ?)")
-        a_params.append(f"%/a/{aid}%")
-    if a_start:
-        a_where.append("date(created_at) >= date(?)")
-        a_params.append(a_start)
-    if a_end:
-        a_where.append("date(created_at) <= date(?)")
-        a_params.append(a_end)
-    a_where_sql = "WHERE " + " AND ".join(a_where)
-    a_rows = db.execute(f"""
-        SELECT date(created_at) AS d, COUNT(*) AS c
-        FROM analytics
-        {a_where_sql}
-        GROUP BY date(created_at)
-        ORDER BY d ASC
-    """, a_params).fetchall()
-    a_total = sum(r["c"] for r in a_rows)
-    a_labels = [r["d"] for r in a_rows]
-    a_values = [r["c"] for r in a_rows]
+{% endblock %}
+"""
 
-    body = render_template_string("""
+ANALYTICS = """{% extends "admin_base.html" %}
+{% block content %}
       <div class="card space-y-8">
         <h2 class="text-xl font-semibold mb-2">Analytics</h2>
 
@@ -425,8 +329,194 @@ def analytics():
           options: { responsive: true, maintainAspectRatio: false }
         });
       </script>
-    """,
-    feed_rows=feed_rows, feed_labels=feed_labels, feed_values=feed_values, feed_total=feed_total, feed_start=feed_start, feed_end=feed_end,
-    q_rows=q_rows, q_labels=q_labels, q_values=q_values, q_total=q_total, qid=qid, q_start=q_start, q_end=q_end,
-    a_rows=a_rows, a_labels=a_labels, a_values=a_values, a_total=a_total, aid=aid, a_start=a_start, a_end=a_end)
-    return render_template_string(ADMIN_BASE, body=body)
\ No newline at end of file
+{% endblock %}
+"""
+
+_env.loader.mapping["admin_base.html"] = ADMIN_BASE
+
+def _stream_page(tpl, **ctx):
+    # rows may be a live cursor or generator: buffered template streaming
+    # lets the client receive the top of the table while SQLite is still
+    # producing rows, and never materializes the page as one string
+    stream = tpl.stream(**ctx)
+    stream.enable_buffering(5)
+    return Response(stream_with_context(stream), mimetype="text/html")
+_DASHBOARD_T = _env.from_string(DASHBOARD)
+_QUESTIONS_T = _env.from_string(QUESTIONS)
+_ANSWERS_T = _env.from_string(ANSWERS)
+_ANALYTICS_T = _env.from_string(ANALYTICS)
+
+# The dashboard totals only move when users post or an admin deletes, so a
+# frequently refreshed dashboard can reuse them for a few seconds instead of
+# re-scanning six tables. Per-worker cache; delete routes zero the timestamp.
+_COUNTS_TTL = 15
+_counts_cache = {"ts": 0.0, "val": None}
+
+def _invalidate_counts():
+    _counts_cache["ts"] = 0.0
+
+# ---------- Routes ----------
+@admin_bp.route("/")
+def dashboard():
+    totals = _counts_cache["val"]
+    if totals is None or time.monotonic() - _counts_cache["ts"] > _COUNTS_TTL:
+        totals = get_db().execute("""
+            SELECT
+              (SELECT COUNT(*) FROM questions)       AS questions,
+              (SELECT COUNT(*) FROM answers)         AS answers,
+              (SELECT COUNT(*) FROM qvotes)          AS qvotes,
+              (SELECT COUNT(*) FROM avotes)          AS avotes,
+              (SELECT COUNT(*) FROM suggestions)     AS suggestions,
+              (SELECT COUNT(*) FROM analytics)       AS events
+        """).fetchone()
+        _counts_cache["val"] = totals
+        _counts_cache["ts"] = time.monotonic()
+    return _DASHBOARD_T.render(t=totals)
+
+@admin_bp.route("/questions")
+def questions():
+    db = get_db()
+    # keyset pagination: id order matches creation order, and the id < ?
+    # probe is a single primary-key seek no matter how deep the admin pages
+    before = request.args.get("before", type=int)
+    cur = db.execute(f"""
+        SELECT q.id, q.title, datetime(q.created_at, 'unixepoch') AS created_at, COUNT(a.id) AS acount
+        FROM questions q
+        LEFT JOIN answers a ON a.question_id = q.id
+        {"WHERE q.id < ?" if before else ""}
+        GROUP BY q.id
+        ORDER BY q.id DESC
+        LIMIT 50
+    """, (before,) if before else ())
+    return _stream_page(_QUESTIONS_T, rows=cur)
+
+@admin_bp.route("/delete-question/<int:qid>")
+def delete_question(qid):
+    db = get_db()
+    db.execute("DELETE FROM questions WHERE id=?", (qid,))
+    db.commit()
+    _invalidate_counts()
+    return redirect(url_for("admin.questions"))
+
+@admin_bp.route("/delete-answer/<int:aid>")
+def delete_answer(aid):
+    db = get_db()
+    db.execute("DELETE FROM answers WHERE id=?", (aid,))
+    db.commit()
+    _invalidate_counts()
+    return redirect(url_for("admin.answers"))
+
+@admin_bp.route("/answers")
+def answers():
+    db = get_db()
+    before = request.args.get("before", type=int)
+    cur = db.execute(f"""
+        SELECT a.id, a.question_id, a.name, a.body, datetime(a.created_at, 'unixepoch') AS created_at
+        FROM answers a
+        {"WHERE a.id < ?" if before else ""}
+        ORDER BY a.id DESC
+        LIMIT 50
+    """, (before,) if before else ())
+    return _stream_page(_ANSWERS_T, rows=_excerpt_rows(cur))
+
+def _excerpt_rows(cur):
+    # plain-text excerpts, computed per row as the template consumes them
+    for r in cur:
+        text = (r["body"] or "").replace("<", " ").replace(">", " ")
+        yield {
+            "id": r["id"],
+            "question_id": r["question_id"],
+            "name": r["name"],
+            "excerpt": text[:120],
+            "created_at": r["created_at"],
+        }
+
+@admin_bp.route("/analytics")
+def analytics():
+    """
+    Shows three analytics sections:
+      1. Feed views (event_type='feed_view')
+      2. Question views (event_type='view'), filterable by question ID
+      3. Answer views (event_type='view_answer'), filterable by answer ID
+    Each with its own date range and filter form, summary, and Chart.js chart.
+    """
+    db = get_db()
+
+    # Feed views filters
+    feed_start = (request.args.get("feed_start") or "").strip()
+    feed_end = (request.args.get("feed_end") or "").strip()
+    feed_where = ["event_type = 'feed_view'"]
+    feed_params = []
+    if feed_start:
+        feed_where.append("date(created_at, 'unixepoch') >= date(?)")
+        feed_params.append(feed_start)
+    if feed_end:
+        feed_where.append("date(created_at, 'unixepoch') <= date(?)")
+        feed_params.append(feed_end)
+    feed_where_sql = "WHERE " + " AND ".join(feed_where)
+    feed_rows = db.execute(f"""
+        SELECT date(created_at, 'unixepoch') AS d, COUNT(*) AS c
+        FROM analytics
+        {feed_where_sql}
+        GROUP BY date(created_at, 'unixepoch')
+        ORDER BY d ASC
+    """, feed_params).fetchall()
+    feed_total = sum(r["c"] for r in feed_rows)
+    feed_labels = [r["d"] for r in feed_rows]
+    feed_values = [r["c"] for r in feed_rows]
+
+    # Question views filters
+    q_start = (request.args.get("q_start") or "").strip()
+    q_end = (request.args.get("q_end") or "").strip()
+    qid = request.args.get("q_qid", type=int)
+    q_where = ["event_type = 'view'"]
+    q_params = []
+    if qid:
+        q_where.append("(path = ? OR path LIKE ?)")
+        q_params.extend((f"/q/{qid}", f"/q/{qid}/%"))
+    if q_start:
+        q_where.append("date(created_at, 'unixepoch') >= date(?)")
+        q_params.append(q_start)
+    if q_end:
+        q_where.append("date(created_at, 'unixepoch') <= date(?)")
+        q_params.append(q_end)
+    q_where_sql = "WHERE " + " AND ".join(q_where)
+    q_rows = db.execute(f"""
+        SELECT date(created_at, 'unixepoch') AS d, COUNT(*) AS c
+        FROM analytics
+        {q_where_sql}
+        GROUP BY date(created_at, 'unixepoch')
+        ORDER BY d ASC
+    """, q_params).fetchall()
+    q_total = sum(r["c"] for r in q_rows)
+    q_labels = [r["d"] for r in q_rows]
+    q_values = [r["c"] for r in q_rows]
+
+    # Answer views filters
+    a_start = (request.args.get("a_start") or "").strip()
+    a_end = (request.args.get("a_end") or "").strip()
+    aid = request.args.get("a_aid", type=int)
+    a_where = ["event_type = 'view_answer'"]
+    a_params = []
+    if aid:
+        a_where.append("(path LIKE ?)")
+        a_params.append(f"%/a/{aid}%")
+    if a_start:
+        a_where.append("date(created_at, 'unixepoch') >= date(?)")
+        a_params.append(a_start)
+    if a_end:
+        a_where.append("date(created_at, 'unixepoch') <= date(?)")
+        a_params.append(a_end)
+    a_where_sql = "WHERE " + " AND ".join(a_where)
+    a_rows = db.execute(f"""
+        SELECT date(created_at, 'unixepoch') AS d, COUNT(*) AS c
+        FROM analytics
+        {a_where_sql}
+        GROUP BY date(created_at, 'unixepoch')
+        ORDER BY d ASC
+    """, a_params).fetchall()
+    a_total = sum(r["c"] for r in a_rows)
+    a_labels = [r["d"] for r in a_rows]
+    a_values = [r["c"] for r in a_rows]
+
+    return _ANALYTICS_T.render(feed_rows=feed_rows, feed_labels=feed_labels, feed_values=feed_values, feed_total=feed_total, feed_start=feed_start, feed_end=feed_end, q_rows=q_rows, q_labels=q_labels, q_values=q_values, q_total=q_total, qid=qid, q_start=q_start, q_end=q_end, a_rows=a_rows, a_labels=a_labels, a_values=a_values, a_total=a_total, aid=aid, a_start=a_start, a_end=a_end)
\ No newline at end of file